@@ -0,0 +1,110 @@
+"""Per-category summaries shown on the Dashboard (KPI cards, histogram, Top/Bottom rankings).
+
+The same functions run when a run is saved (stored in run_aggregates) and, for uploaded templates that are
+not in the database, live on the Dashboard, so both paths show identical numbers and orderings.
+"""
+import numpy as np
+import pandas as pd
+
+HISTOGRAM_BINS = 20
+# Longest ranking kept per category; matches the largest "Count" on the Top/Bottom tab
+RANK_LIMIT = 30
+
+
+def _smallest_positions(keys: np.ndarray, site_names: np.ndarray, limit: int) -> np.ndarray:
+    """Positions of the `limit` smallest keys, ties broken by site name. Only the rows at or below the
+    limit-th key (found with a partial selection) are sorted, so the cost does not grow with a full sort."""
+    n = len(keys)
+    if limit <= 0 or not n:
+        return np.empty(0, dtype=np.intp)
+    if limit < n:
+        kth = np.partition(keys, limit - 1)[limit - 1]
+        candidates = np.flatnonzero(keys <= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((site_names[candidates].astype(str), keys[candidates]))
+    return candidates[order[:limit]]
+
+
+def top_bottom_positions(site_names, values, limit: int) -> tuple:
+    """(top, bottom) positions of the `limit` largest and smallest values; ties are broken by site name so
+    the order never depends on row order. Shared by every ranking on the Dashboard."""
+    site_names = np.asarray(site_names, dtype=object)
+    values = np.asarray(values, dtype=float)
+    return _smallest_positions(-values, site_names, limit), _smallest_positions(values, site_names, limit)
+
+
+def rank_order(site_names, values, descending: bool, limit: int) -> np.ndarray:
+    """Positions of the first `limit` rows by value (largest first when `descending`)."""
+    site_names = np.asarray(site_names, dtype=object)
+    values = np.asarray(values, dtype=float)
+    return _smallest_positions(-values if descending else values, site_names, limit)
+
+
+def summarize_category(site_names: np.ndarray, values: np.ndarray, limit: int = RANK_LIMIT) -> dict:
+    """Summary of one category. `values` must already be numeric with missing values as 0.
+
+    Keys: total, mean, sites, nonzero, max_site, max_value, min_site, min_value, histogram {counts, edges},
+    ranking {top, bottom, top_nonzero, bottom_nonzero} as lists of [site, value].
+    """
+    site_names = np.asarray(site_names, dtype=object)
+    values = np.asarray(values, dtype=float)
+    summary = {
+        "total": float(values.sum()),
+        "mean": float(values.mean()) if len(values) else float("nan"),
+        "sites": int(len(values)),
+        "nonzero": int(np.count_nonzero(values)),
+        "max_site": None,
+        "max_value": None,
+        "min_site": None,
+        "min_value": None,
+        "histogram": {"counts": [], "edges": []},
+        "ranking": {"top": [], "bottom": [], "top_nonzero": [], "bottom_nonzero": []},
+    }
+    if not len(values):
+        return summary
+
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    summary["histogram"] = {"counts": counts.tolist(), "edges": edges.tolist()}
+
+    nonzero = values != 0
+    ranking = summary["ranking"]
+    for name, mask in (("", None), ("_nonzero", nonzero)):
+        names = site_names if mask is None else site_names[mask]
+        vals = values if mask is None else values[mask]
+        for direction, order in zip(("top", "bottom"), top_bottom_positions(names, vals, limit)):
+            ranking[direction + name] = [[str(names[i]), float(vals[i])] for i in order]
+
+    summary["max_site"], summary["max_value"] = ranking["top"][0]
+    summary["min_site"], summary["min_value"] = ranking["bottom"][0]
+    return summary
+
+
+def summarize_frame(df: pd.DataFrame, categories, limit: int = RANK_LIMIT) -> dict:
+    """Summaries for several categories of a numeric Dashboard frame (site names in the first column).
+    Rows without a site name are ignored, as on the Dashboard."""
+    site_col = df.columns[0]
+    df = df.dropna(subset=[site_col])
+    site_names = df[site_col].astype(str).to_numpy(dtype=object)
+    return {
+        category: summarize_category(site_names, df[category].to_numpy(dtype=float), limit)
+        for category in categories
+    }
+
+
+def histogram_frame(summary: dict) -> pd.DataFrame:
+    """Histogram of a summary as a DataFrame: bin label, bin start/end and count."""
+    counts = summary["histogram"]["counts"]
+    edges = summary["histogram"]["edges"]
+    return pd.DataFrame({
+        "bin": [f"{edges[i]:,.2f} – {edges[i + 1]:,.2f}" for i in range(len(counts))],
+        "start": edges[:-1],
+        "end": edges[1:],
+        "count": counts,
+    })
+
+
+def ranking_frame(summary: dict, key: str, n: int, site_name_col, value_col) -> pd.DataFrame:
+    """First `n` entries of a stored ranking as a two-column DataFrame."""
+    rows = summary["ranking"][key][:n]
+    return pd.DataFrame(rows, columns=[site_name_col, value_col])
@@ -1,173 +1,117 @@
+from __future__ import annotations
 
-import streamlit as st
-import pandas as pd
-import io
-import openpyxl
-import sqlite3
 import json
-from pathlib import Path
-from datetime import datetime
-
-# Optional viz libs
-try:
-    import plotly.express as px
-    PLOTLY_AVAILABLE = True
-except Exception:  # pragma: no cover
-    px = None
-    PLOTLY_AVAILABLE = False
-
-# Fungsi untuk memproses data (tidak ada perubahan di fungsi ini)
-def process_data(source_df, template_df, target_column, mode):
-    """
-    Fungsi ini mengambil data sumber, menghitungnya, dan memperbarui DataFrame template.
-    """
-    # 1. Ekstrak dan hitung data dari file sumber
-    # Filter baris di mana 'Student Code' dan 'Course Code' tidak kosong
-    filtered_df = source_df.dropna(subset=['Student Code', 'Course Code'])
-    # Hitung kemunculan setiap 'Site Name'
-    site_counts = filtered_df['Site Name'].value_counts()
-    # Buat salinan template_df agar tidak mengubah data asli secara langsung
-    updated_df = template_df.copy()
-    # Asumsikan kolom A (kolom pertama) di template adalah untuk 'Site Name'
-    site_name_col_in_template = updated_df.columns[0]
-    # 2. Iterasi melalui hasil hitungan dan perbarui template
-    for site_name, count in site_counts.items():
-        # Cari baris yang cocok dengan site_name di template
-        match_row = updated_df[updated_df[site_name_col_in_template] == site_name]
-        if not match_row.empty:
-            # Jika Site Name ditemukan
-            idx = match_row.index[0]
-            if mode == "Add (Tambah)":
-                # Ambil nilai saat ini, ubah ke numerik, anggap 0 jika kosong/error
-                current_value = pd.to_numeric(updated_df.loc[idx, target_column], errors='coerce').fillna(0)
-                updated_df.loc[idx, target_column] = current_value + count
-            else:  # Mode "Replace (Ganti)"
-                updated_df.loc[idx, target_column] = count
-        else:
-            # Jika Site Name tidak ditemukan
-            # Buat baris baru sebagai dictionary
-            new_row = {site_name_col_in_template: site_name, target_column: count}
-            # Tambahkan baris baru ke DataFrame
-            updated_df = pd.concat([updated_df, pd.DataFrame([new_row])], ignore_index=True)
-    return updated_df
-
-# --- SQLite helpers ---
-DB_PATH = Path(__file__).with_name("master_sheet.db")
-
-def _get_conn():
-    # check_same_thread=False allows usage across Streamlit threads
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
-
-def init_db():
-    with _get_conn() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS runs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                created_at TEXT NOT NULL,
-                site_name_header TEXT NOT NULL,
-                columns_json TEXT NOT NULL
-            )
-            """
-        )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS master_values (
-                run_id INTEGER NOT NULL,
-                site_name TEXT NOT NULL,
-                category TEXT NOT NULL,
-                value REAL,
-                PRIMARY KEY (run_id, site_name, category),
-                FOREIGN KEY(run_id) REFERENCES runs(id) ON DELETE CASCADE
-            )
-            """
-        )
-        conn.commit()
+import os
 
-def save_result_to_db(result_df: pd.DataFrame, header: list[str]) -> dict:
-    """Persist a processed wide table into SQLite in a normalized form.
-    Returns metadata for the run: {run_id, created_at, site_name_header, categories}
-    """
-    if not isinstance(result_df, pd.DataFrame) or not header or len(header) < 1:
-        return {}
-    init_db()
-    site_name_header = str(header[0])
-    categories = [str(c) for c in header[1:]]
-    created_at = datetime.utcnow().isoformat()
-
-    with _get_conn() as conn:
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO runs (created_at, site_name_header, columns_json) VALUES (?, ?, ?)",
-            (created_at, site_name_header, json.dumps(categories)),
-        )
-        run_id = c.lastrowid
-
-        # Prepare insert
-        rows_to_insert = []
-        for _, row in result_df.iterrows():
-            site_name = row.get(site_name_header, None)
-            if pd.isna(site_name):
-                continue
-            site_name = str(site_name)
-            for cat in categories:
-                val = row.get(cat, None)
-                # Coerce to numeric if possible, otherwise NULL
-                try:
-                    val_num = pd.to_numeric(val, errors="coerce")
-                    val_out = None if pd.isna(val_num) else float(val_num)
-                except Exception:
-                    val_out = None
-                rows_to_insert.append((run_id, site_name, cat, val_out))
-
-        c.executemany(
-            "INSERT OR REPLACE INTO master_values (run_id, site_name, category, value) VALUES (?, ?, ?, ?)",
-            rows_to_insert,
-        )
-        conn.commit()
+from typing import TYPE_CHECKING
 
-    return {"run_id": run_id, "created_at": created_at, "site_name_header": site_name_header, "categories": categories}
+import streamlit as st
 
-def load_latest_from_db() -> dict | None:
-    """Load the most recent run and reconstruct a wide DataFrame.
-    Returns dict: { df, meta }
-    """
-    if not DB_PATH.exists():
-        return None
-    init_db()
-    with _get_conn() as conn:
-        c = conn.cursor()
-        c.execute("SELECT id, created_at, site_name_header, columns_json FROM runs ORDER BY id DESC LIMIT 1")
-        row = c.fetchone()
-        if not row:
-            return None
-        run_id, created_at, site_name_header, columns_json = row
-        categories = json.loads(columns_json)
-        c.execute("SELECT site_name, category, value FROM master_values WHERE run_id = ?", (run_id,))
-        vals = c.fetchall()
-
-    # Build wide DataFrame
-    data_map = {}
-    for site_name, category, value in vals:
-        if site_name not in data_map:
-            data_map[site_name] = {cat: None for cat in categories}
-        if category in data_map[site_name]:
-            data_map[site_name][category] = value
-
-    rows = []
-    for site, cat_map in data_map.items():
-        row = {site_name_header: site}
-        row.update(cat_map)
-        rows.append(row)
-
-    if not rows:
+from profiling import Profiler, span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from site_index import SiteIndex
+    from upload_cache import ParseCache
+
+# Heavy libraries (pandas, openpyxl, plotly, pyarrow) are imported inside the functions that need them, so
+# pages that do not touch data (e.g. the User Guide) start without loading them.
+
+def load_plotly():
+    """plotly.express on first use; None when plotly is not installed (charts fall back to Streamlit's)."""
+    try:
+        import plotly.express as px
+    except Exception:  # pragma: no cover
         return None
-    df = pd.DataFrame(rows)
-    # Ensure column order: site name first, then categories
-    df = df[[site_name_header] + categories]
-    meta = {"run_id": run_id, "created_at": created_at, "site_name_header": site_name_header, "categories": categories}
-    return {"df": df, "meta": meta}
+    return px
+
+# --- Cached data layer (Dashboard) ---
+# Bounded caches shared by all sessions: least recently used entries are evicted beyond
+# CACHE_MAX_ENTRIES and every entry expires after CACHE_TTL_SECONDS.
+CACHE_MAX_ENTRIES = 16
+CACHE_TTL_SECONDS = 60 * 60
+
+@st.cache_resource(show_spinner=False)
+def get_parse_cache() -> ParseCache:
+    """Parsed uploads (templates, source counts, sheet row index) keyed by content hash, shared by all sessions."""
+    from upload_cache import UPLOAD_CACHE_MAX_BYTES, ParseCache
+
+    return ParseCache(UPLOAD_CACHE_MAX_BYTES)
+
+# cache_resource returns the loaded object itself (no pickled copy), so a memory-mapped snapshot stays zero-copy
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_run(run_id: int) -> dict | None:
+    """Load a stored run once per run_id (runs are immutable once saved; treat the result as read-only)."""
+    from storage import load_run_from_db
+
+    return load_run_from_db(run_id)
+
+# cache_resource: one compact frame per dataset shared by all sessions instead of a float64 copy per session
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_compact_dataset(dataset_key: str, _df: pd.DataFrame) -> dict:
+    """Site-name column plus every category coerced to numbers (non-numeric → 0, see compaction.compact_dataset),
+    once per dataset. Treat the result as read-only."""
+    from compaction import compact_dataset
+
+    return compact_dataset(_df)
+
+def compact_for_session(dataset_key: str, df: pd.DataFrame, profiler: Profiler | None = None) -> dict:
+    """cached_compact_dataset plus the memory report of this session (shown in the Performance expander)."""
+    with span(profiler, "compact_frame", rows=len(df)) as entry:
+        compact = cached_compact_dataset(dataset_key, df)
+        entry["saved_mib"] = round((compact["nbytes_before"] - compact["nbytes_after"]) / 2**20, 3)
+    st.session_state.memory_report = {
+        "dataset": dataset_key,
+        "rows": len(df),
+        "before_mib": round(compact["nbytes_before"] / 2**20, 3),
+        "after_mib": round(compact["nbytes_after"] / 2**20, 3),
+        "dropped_columns": [str(col) for col in compact["dropped"]],
+    }
+    return compact
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_run_aggregates(run_id: int) -> dict:
+    """Precomputed per-category KPIs of a stored run (empty for runs saved before aggregates existed)."""
+    from storage import load_run_aggregates
+
+    return load_run_aggregates(run_id)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES * 4, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_category_summary(dataset_key: str, category, _numeric_df: pd.DataFrame) -> dict:
+    """KPIs of one category for datasets that are not stored runs (e.g. an uploaded template)."""
+    from analytics import summarize_frame
+
+    return summarize_frame(_numeric_df[[_numeric_df.columns[0], category]], [category])[category]
+
+# History queries are keyed by the latest run id, so a newly saved run invalidates them
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES * 4, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_category_trend(category: str, limit_runs: int, latest_run_id: int) -> pd.DataFrame:
+    from storage import load_category_trend
+
+    return load_category_trend(category, limit_runs=limit_runs)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES * 4, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_site_history(site_name: str, limit_runs: int, latest_run_id: int) -> pd.DataFrame:
+    from storage import load_site_history
+
+    return load_site_history(site_name, limit_runs=limit_runs)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_site_index(dataset_key: str, _df: pd.DataFrame) -> SiteIndex:
+    """Normalized site-name index of a dataset's rows, built once per dataset."""
+    from site_index import SiteIndex
+
+    return SiteIndex(_df[_df.columns[0]])
+
+def dataset_key_for(df: pd.DataFrame) -> str:
+    key = st.session_state.get("template_key")
+    if key is None:
+        import pandas as pd
+
+        key = f"frame:{pd.util.hash_pandas_object(df, index=True).sum()}"
+        st.session_state.template_key = key
+    return key
 
 # --- UI Streamlit ---
 st.set_page_config(layout="wide")
@@ -179,7 +123,7 @@ st.set_page_config(layout="wide")
 st.title("📊 Master Sheet Assistant")
 st.caption("Separate menus: Dashboard & Data Input")
 
-menu = st.sidebar.radio("Menu", ["Dashboard", "Data Input", "User Guide"], index=1)
+menu = st.sidebar.radio("Menu", ["Dashboard", "Data Input", "User Guide"], index=1, key="menu")
 
 # Session placeholders
 if "template_df" not in st.session_state:
@@ -190,6 +134,11 @@ if "last_processed_ext" not in st.session_state:
     st.session_state.last_processed_ext = ".xlsx"
 
 def render_dashboard():
+    import pandas as pd
+
+    from analytics import histogram_frame, rank_order, ranking_frame
+    from storage import get_latest_run_id
+
     st.header("📈 Partner Engagement Dashboard")
     st.write("Explore the Master Sheet data interactively: summary, Top/Bottom, category comparisons, and company profile.")
 
@@ -226,13 +175,20 @@ def render_dashboard():
         unsafe_allow_html=True,
     )
 
+    # Data loads of this rerun, shown in the "Performance" expander below the page
+    profiler = Profiler("dashboard")
+    st.session_state.dashboard_profile = profiler
+
     # Try loading latest processed data from DB if session template is empty
     template_df = st.session_state.template_df
     if template_df is None:
-        loaded = load_latest_from_db()
+        latest_run_id = get_latest_run_id()
+        with span(profiler, "load_run", run_id=latest_run_id):
+            loaded = cached_run(latest_run_id) if latest_run_id is not None else None
         if loaded is not None:
             template_df = loaded["df"]
             st.session_state.template_df = template_df
+            st.session_state.template_key = f"run:{loaded['meta']['run_id']}"
             st.session_state._db_meta = loaded["meta"]
             st.info(
                 f"Using latest processed data from database (run at {loaded['meta']['created_at']} UTC). Upload a template to override.")
@@ -246,9 +202,13 @@ def render_dashboard():
 
     template_df = st.session_state.template_df
     if uploaded_template is not None:
+        from upload_cache import parse_template
+
         try:
-            template_df = pd.read_excel(uploaded_template, sheet_name="Master Sheet")
+            with span(profiler, "parse_template"):
+                template_hash, template_df = parse_template(get_parse_cache(), uploaded_template)
             st.session_state.template_df = template_df
+            st.session_state.template_key = f"upload:{template_hash}"
         except Exception as e:
             st.error(f"Failed to read template: {e}")
             return
@@ -257,21 +217,57 @@ def render_dashboard():
         st.info("Please upload a template here or in the 'Data Input' menu first.")
         return
 
-    # Validasi kategori yang ada di template
+    # Compact numeric view of every category, computed once per dataset and shared by all tabs and sessions
     site_name_col = template_df.columns[0]
-    available_categories = [c for c in template_df.columns if c != site_name_col]
+    dataset_key = dataset_key_for(template_df)
+    compact = compact_for_session(dataset_key, template_df, profiler)
+    numeric_df = compact["df"]
+
+    # Validasi kategori yang ada di template (kolom tanpa header dan tanpa isi sudah dibuang)
+    available_categories = list(numeric_df.columns[1:])
     if not available_categories:
         st.warning("No category columns found in 'Master Sheet' besides the first column (company name).")
         st.write("Available headers in the template:")
         st.code("\n".join(list(map(str, template_df.columns))))
         return
-    # Helpers
-    def as_numeric(series: pd.Series) -> pd.Series:
-        return pd.to_numeric(series, errors="coerce").fillna(0)
+    # KPI summaries: precomputed per run when the data comes from the database, otherwise computed once per category
+    run_aggregates = {}
+    if dataset_key.startswith("run:"):
+        with span(profiler, "load_run_aggregates"):
+            run_aggregates = cached_run_aggregates(int(dataset_key.split(":", 1)[1]))
+
+    def category_summary(cat) -> dict:
+        summary = run_aggregates.get(str(cat))
+        if summary is None:
+            summary = cached_category_summary(dataset_key, cat, numeric_df)
+        return summary
+
+    # Satu pilihan per nama ternormalisasi; nama ganda dilaporkan seperti di halaman Data Input
+    site_index = cached_site_index(dataset_key, template_df)
+    companies = [str(name) for name in site_index.unique_names()]
+    if site_index.has_duplicates:
+        duplicates = site_index.duplicates()
+        st.warning(
+            f"{duplicates['key'].nunique()} company name(s) appear more than once in this data "
+            "(compared ignoring case and surrounding spaces). The Company Profile shows the first row of each."
+        )
+        with st.expander("Duplicate company names"):
+            duplicate_table = pd.DataFrame({
+                "Company name": duplicates["name"],
+                "Shown as": duplicates.groupby("key", sort=False)["name"].transform("first"),
+            })
+            if not dataset_key.startswith("run:"):
+                from sheet_layout import SHEET_FIRST_DATA_ROW
+
+                duplicate_table.insert(0, "Excel row", duplicates["position"] + SHEET_FIRST_DATA_ROW)
+            st.dataframe(duplicate_table, hide_index=True)
+
+    px = load_plotly()
+    plotly_available = px is not None
 
     # Tabs for different perspectives
-    tab_overview, tab_top, tab_matrix, tab_profile = st.tabs([
-        "Overview", "Top/Bottom", "Matrix", "Company Profile"
+    tab_overview, tab_top, tab_matrix, tab_profile, tab_history = st.tabs([
+        "Overview", "Top/Bottom", "Matrix", "Company Profile", "History"
     ])
 
     with tab_overview:
@@ -281,13 +277,9 @@ def render_dashboard():
         with c1:
             st.subheader("Category Summary", anchor=False)
 
-        df_cat = template_df[[site_name_col, category]].copy()
-        df_cat[category] = as_numeric(df_cat[category])
-        df_cat = df_cat.dropna(subset=[site_name_col])
-        total_val = float(df_cat[category].sum())
-        avg_val = float(df_cat[category].mean())
-        max_row = df_cat.loc[df_cat[category].idxmax()] if not df_cat.empty else None
-        min_row = df_cat.loc[df_cat[category].idxmin()] if not df_cat.empty else None
+        summary = category_summary(category)
+        total_val = summary["total"]
+        avg_val = summary["mean"]
 
         def fmt_value(v: float) -> str:
             if v is None:
@@ -323,35 +315,37 @@ def render_dashboard():
         with k3:
             metric_card(
                 "Maximum",
-                float(max_row[category]) if max_row is not None else 0,
-                subtitle=f"Company: {str(max_row[site_name_col]) if max_row is not None else '-'}",
+                summary["max_value"] if summary["max_site"] is not None else 0,
+                subtitle=f"Company: {summary['max_site'] if summary['max_site'] is not None else '-'}",
                 icon="⬆",
                 tone="success",
             )
         with k4:
             metric_card(
                 "Minimum",
-                float(min_row[category]) if min_row is not None else 0,
-                subtitle=f"Company: {str(min_row[site_name_col]) if min_row is not None else '-'}",
+                summary["min_value"] if summary["min_site"] is not None else 0,
+                subtitle=f"Company: {summary['min_site'] if summary['min_site'] is not None else '-'}",
                 icon="⬇",
                 tone="warning",
             )
 
         st.markdown("### Value Distribution", help="Distribution of values in the selected category.")
-        if PLOTLY_AVAILABLE:
-            fig = px.histogram(df_cat, x=category, nbins=20, title="Histogram", template="simple_white")
+        hist_df = histogram_frame(summary)
+        if plotly_available:
+            fig = px.bar(hist_df, x="bin", y="count", title="Histogram", template="simple_white")
+            fig.update_layout(bargap=0.05, xaxis_title=str(category))
             st.plotly_chart(fig, use_container_width=True)
         else:
-            st.bar_chart(df_cat[category])
+            st.bar_chart(hist_df.set_index("bin")["count"])
 
         st.markdown("### Sample Data", help="Top 5 and Bottom 5 values.")
         colA, colB = st.columns(2)
         with colA:
             st.caption("Top 5")
-            st.table(df_cat.sort_values(category, ascending=False).head(5).reset_index(drop=True))
+            st.table(ranking_frame(summary, "top", 5, site_name_col, category))
         with colB:
             st.caption("Bottom 5")
-            st.table(df_cat.sort_values(category, ascending=True).head(5).reset_index(drop=True))
+            st.table(ranking_frame(summary, "bottom", 5, site_name_col, category))
 
     with tab_top:
         left, right = st.columns([2, 1])
@@ -361,19 +355,15 @@ def render_dashboard():
             top_n = st.slider("Count", min_value=5, max_value=30, value=10, step=1)
             include_zero = st.checkbox("Include zero values", value=False)
 
-        df_tb = template_df[[site_name_col, category_tb]].copy()
-        df_tb[category_tb] = as_numeric(df_tb[category_tb])
-        df_tb = df_tb.dropna(subset=[site_name_col])
-        if not include_zero:
-            df_tb = df_tb[df_tb[category_tb] != 0]
-        df_tb = df_tb.sort_values(category_tb, ascending=(mode_rank == "Bottom")).head(top_n)
+        ranking_key = ("top" if mode_rank == "Top" else "bottom") + ("" if include_zero else "_nonzero")
+        df_tb = ranking_frame(category_summary(category_tb), ranking_key, top_n, site_name_col, category_tb)
 
         with left:
             st.subheader(f"{mode_rank} {top_n} Companies — {category_tb}")
             st.dataframe(df_tb.reset_index(drop=True))
 
         st.markdown("### Visualization")
-        if PLOTLY_AVAILABLE:
+        if plotly_available:
             fig = px.bar(
                 df_tb.sort_values(category_tb, ascending=True),
                 x=category_tb,
@@ -403,14 +393,12 @@ def render_dashboard():
         top_for_matrix = st.slider("Top N companies (by selected total)", 5, 30, 10)
 
         if selected_cats:
-            df_m = template_df[[site_name_col] + selected_cats].copy()
-            for c in selected_cats:
-                df_m[c] = as_numeric(df_m[c])
-            df_m["__total__"] = df_m[selected_cats].sum(axis=1)
-            df_m = df_m.sort_values("__total__", ascending=False).head(top_for_matrix)
-            df_show = df_m.drop(columns=["__total__"]).set_index(site_name_col)
-
-            if PLOTLY_AVAILABLE:
+            df_m = numeric_df[[site_name_col] + selected_cats]
+            totals = df_m[selected_cats].sum(axis=1).to_numpy()
+            top_rows = rank_order(df_m[site_name_col].to_numpy(dtype=object), totals, True, top_for_matrix)
+            df_show = df_m.iloc[top_rows].set_index(site_name_col)
+
+            if plotly_available:
                 fig = px.imshow(
                     df_show,
                     color_continuous_scale="Blues",
@@ -425,24 +413,25 @@ def render_dashboard():
 
     with tab_profile:
         st.subheader("Company Profile")
-        companies = template_df[site_name_col].dropna().astype(str).unique().tolist()
         sel_company = st.selectbox("Select Company", options=companies)
         # Gather all available categories for the profile
-        prof_cats = [c for c in available_categories if c in template_df.columns]
-        df_p = template_df[[site_name_col] + prof_cats].copy()
-        for c in prof_cats:
-            df_p[c] = as_numeric(df_p[c])
-        row = df_p[df_p[site_name_col].astype(str) == str(sel_company)]
-        if row.empty:
+        prof_cats = available_categories
+        company_pos = site_index.position(sel_company)
+        if company_pos is None:
             st.warning("Company data not found.")
         else:
-            row_vals = row[prof_cats].iloc[0]
+            row_vals = numeric_df[prof_cats].iloc[company_pos].astype(float)
+            markers = compact["markers"]
             cA, cB = st.columns([1, 1])
             with cA:
                 st.markdown(f"**Partner Name:** {sel_company}")
-                st.table(pd.DataFrame({"Category": prof_cats, "Value": row_vals.values}))
+                profile_table = pd.DataFrame({"Category": prof_cats, "Value": row_vals.values})
+                marked = [c in markers.columns and bool(markers[c].iat[company_pos]) for c in prof_cats]
+                if any(marked):
+                    profile_table["Note"] = ["non-numeric (shown as 0)" if m else "" for m in marked]
+                st.table(profile_table)
             with cB:
-                if PLOTLY_AVAILABLE and len(prof_cats) >= 3:
+                if plotly_available and len(prof_cats) >= 3:
                     # Radar chart
                     plot_df = pd.DataFrame({"Category": prof_cats, "Value": row_vals.values})
                     fig = px.line_polar(plot_df, r="Value", theta="Category", line_close=True, template="simple_white")
@@ -451,110 +440,381 @@ def render_dashboard():
                 else:
                     st.bar_chart(row_vals, use_container_width=True)
 
+    with tab_history:
+        st.subheader("Run History")
+        latest_run_id = get_latest_run_id()
+        if latest_run_id is None:
+            st.info("No processed runs are stored in the database yet. Process data in the 'Data Input' menu first.")
+            return
+        h1, h2 = st.columns([2, 1])
+        with h2:
+            hist_cat = st.selectbox("Category", options=available_categories, key="hist_cat")
+            hist_runs = st.slider("Last N runs", min_value=2, max_value=100, value=20, step=1, key="hist_runs")
+        with span(profiler, "load_category_trend", runs=hist_runs):
+            trend = cached_category_trend(str(hist_cat), hist_runs, latest_run_id)
+        with h1:
+            if trend.empty:
+                st.info("This category does not appear in the stored runs.")
+            elif plotly_available:
+                fig = px.line(trend, x="created_at", y="total", markers=True, title=f"Total per run — {hist_cat}", template="simple_white")
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.line_chart(trend.set_index("created_at")["total"])
+        st.dataframe(trend, use_container_width=True)
+
+        st.markdown("### Partner History", help="Values of one company across runs, with the change since its previous run.")
+        hist_company = st.selectbox("Select Company", options=companies, key="hist_company")
+        with span(profiler, "load_site_history", runs=hist_runs):
+            site_hist = cached_site_history(str(hist_company), hist_runs, latest_run_id)
+        if site_hist.empty:
+            st.info("No stored runs contain this company.")
+        else:
+            cat_hist = site_hist[site_hist["category"] == str(hist_cat)]
+            if plotly_available and not cat_hist.empty:
+                fig = px.line(cat_hist, x="created_at", y="value", markers=True, title=f"{hist_company} — {hist_cat}", template="simple_white")
+                st.plotly_chart(fig, use_container_width=True)
+            elif not cat_hist.empty:
+                st.line_chart(cat_hist.set_index("created_at")["value"])
+            st.dataframe(
+                site_hist.pivot_table(index=["run_id", "created_at"], columns="category", values="delta", dropna=False),
+                use_container_width=True,
+            )
+            st.caption("Table: change per category since the previous run (empty for the first run in range).")
+
+
+def aggregation_input(source_file, parse_cache: ParseCache, key: str, label: str = "What to count:"):
+    """Aggregation selector for one source file; returns (aggregation, value_column)."""
+    from processing import AGGREGATIONS, SOURCE_COLUMNS
+    from upload_cache import parse_source_columns
+
+    aggregation = st.selectbox(
+        label,
+        options=AGGREGATIONS,
+        help="Count rows, count each student (or student-course pair) once per company, or add up a numeric column.",
+        key=f"{key}_aggregation",
+    )
+    if aggregation != AGGREGATIONS[-1]:
+        return aggregation, None
+    value_column = st.selectbox(
+        "Column to sum",
+        options=[name for name in parse_source_columns(parse_cache, source_file) if name not in SOURCE_COLUMNS],
+        key=f"{key}_value_column",
+    )
+    return aggregation, value_column
 
 def render_input():
     st.header("🧾 Data Input & Processing")
     st.write("This app counts occurrences from a source Excel file and writes them into a template file.")
 
+    run_type = st.radio(
+        "Processing type:",
+        options=["Single file", "Batch (multiple files)"],
+        horizontal=True,
+        help="Batch: fill several target columns from several source files in one run, saving the template only once.",
+        key="run_type_radio",
+    )
+    is_batch = run_type != "Single file"
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.subheader("1. Upload Source File")
-        source_file = st.file_uploader("Choose the Excel file containing raw data", type=["xlsx"], key="source_uploader")
+        if is_batch:
+            source_files = st.file_uploader(
+                "Choose the Excel files containing raw data",
+                type=["xlsx"],
+                accept_multiple_files=True,
+                key="batch_source_uploader",
+            )
+        else:
+            source_file = st.file_uploader("Choose the Excel file containing raw data", type=["xlsx"], key="source_uploader")
+            source_files = [source_file] if source_file else []
 
     with col2:
         st.subheader("2. Upload Template File")
         template_file = st.file_uploader("Choose the target Excel template file", type=["xlsx", "xlsm"], key="template_uploader")
 
-    if source_file and template_file:
+    if source_files and template_file:
+        from processing import OUTPUT_ENGINES, SHEET_FIRST_DATA_ROW, UPDATE_MODES
+        from upload_cache import parse_sheet_index, parse_template
+
         try:
-            source_df = pd.read_excel(source_file, header=1)
-            source_df.columns = source_df.columns.str.strip()
-            template_df = pd.read_excel(template_file, sheet_name="Master Sheet")
+            # Parse sekali per isi file; rerun karena perubahan widget memakai hasil dari cache
+            parse_cache = get_parse_cache()
+            template_hash, template_df = parse_template(parse_cache, template_file)
 
             st.session_state.template_df = template_df
+            st.session_state.template_key = f"upload:{template_hash}"
+            # Ringkas sekali per template; Dashboard memakai hasil yang sama
+            compact_for_session(st.session_state.template_key, template_df)
+
+            sheet_index = parse_sheet_index(parse_cache, template_file)
+            if sheet_index.has_duplicates:
+                duplicates = sheet_index.duplicates(offset=SHEET_FIRST_DATA_ROW)
+                st.warning(
+                    f"{duplicates['key'].nunique()} company name(s) appear more than once in the template "
+                    "(compared ignoring case and surrounding spaces). Counts are written to the first row of each."
+                )
+                with st.expander("Duplicate company names"):
+                    st.dataframe(
+                        duplicates.rename(columns={"position": "Excel row", "name": "Company name"})[["Excel row", "Company name"]],
+                        hide_index=True,
+                    )
 
             st.subheader("3. Configure Processing Options")
-            target_column = st.selectbox(
-                "Select the target column in 'Master Sheet' to place the counts:",
-                options=template_df.columns,
-                key="target_column_select",
-            )
-
-            mode = st.radio(
-                "Choose the update mode:",
-                options=["Add (Tambah)", "Replace (Ganti)"],
-                help="Add: add the new counts to existing values. Replace: overwrite existing values with the new counts.",
-                key="mode_radio",
-            )
+            jobs = []
+            aggregations = []
+            max_workers = 1
+            if not is_batch:
+                target_column = st.selectbox(
+                    "Select the target column in 'Master Sheet' to place the counts:",
+                    options=template_df.columns,
+                    key="target_column_select",
+                )
 
-            if st.button("🚀 Process Now!", key="process_button"):
-                with st.spinner("Processing data..."):
-                    result_df = process_data(source_df, template_df, target_column, mode)
-                    st.session_state.result_df = result_df
-                    st.subheader("4. Result")
-                    st.write("Data processed successfully. Here is a preview of the result:")
-                    st.dataframe(result_df.fillna(''))
-
-                    # Tulis hasil ke workbook template untuk menjaga format
-                    template_file.seek(0)
-                    wb = openpyxl.load_workbook(template_file, keep_vba=True)
-                    ws = wb["Master Sheet"]
-
-                    header = [cell.value for cell in ws[1]]
-                    site_name_col = header[0]
-                    site_name_to_row = {}
-                    for row in range(2, ws.max_row + 1):
-                        val = ws.cell(row=row, column=1).value
-                        if val:
-                            site_name_to_row[val] = row
-
-                    for _, row_data in result_df.iterrows():
-                        site_name = row_data[site_name_col]
-                        if site_name in site_name_to_row:
-                            row_idx = site_name_to_row[site_name]
-                        else:
-                            row_idx = ws.max_row + 1
-                            ws.insert_rows(row_idx)
-                            ws.cell(row=row_idx, column=1, value=site_name)
-                            site_name_to_row[site_name] = row_idx
-                        for col_idx, col_name in enumerate(header, start=1):
-                            ws.cell(row=row_idx, column=col_idx, value=row_data.get(col_name, None))
-
-                    output = io.BytesIO()
-                    wb.save(output)
-                    processed_data = output.getvalue()
-
-                    ext = ".xlsm" if template_file.name.lower().endswith(".xlsm") else ".xlsx"
-                    st.session_state.last_processed_ext = ext
-                    mime_type = (
-                        "application/vnd.ms-excel.sheet.macroEnabled.12"
-                        if ext == ".xlsm"
-                        else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                c_mode, c_aggregation = st.columns(2)
+                with c_mode:
+                    mode = st.radio(
+                        "Choose the update mode:",
+                        options=UPDATE_MODES,
+                        help="Add: add the new counts to existing values. Replace: overwrite existing values with the new counts. "
+                        "Incremental: for a growing export, count only the rows added since the last run of this file "
+                        "and store the running total.",
+                        key="mode_radio",
                     )
+                with c_aggregation:
+                    aggregations.append(aggregation_input(source_file, parse_cache, key="single"))
+                jobs.append((source_file, target_column, mode))
+            else:
+                st.write("Choose the target column, update mode and what to count for each source file:")
+                for i, batch_file in enumerate(source_files):
+                    c_name, c_target, c_mode, c_aggregation = st.columns([2, 2, 2, 2])
+                    with c_name:
+                        st.markdown(f"**{batch_file.name}**")
+                    with c_target:
+                        batch_target = st.selectbox(
+                            "Target column",
+                            options=template_df.columns,
+                            key=f"batch_target_{i}_{batch_file.name}",
+                        )
+                    with c_mode:
+                        batch_mode = st.radio(
+                            "Update mode",
+                            options=UPDATE_MODES,
+                            horizontal=True,
+                            key=f"batch_mode_{i}_{batch_file.name}",
+                        )
+                    with c_aggregation:
+                        aggregations.append(
+                            aggregation_input(batch_file, parse_cache, key=f"batch_{i}_{batch_file.name}", label="Count")
+                        )
+                    jobs.append((batch_file, batch_target, batch_mode))
+
+                max_workers = st.number_input(
+                    "Parallel workers",
+                    min_value=1,
+                    max_value=os.cpu_count() or 1,
+                    value=min(4, os.cpu_count() or 1),
+                    help="Number of processes used to parse the source files at the same time. Results are identical to 1 worker.",
+                    key="batch_workers_input",
+                )
 
-                    # Save to SQLite database for Dashboard auto-use
-                    try:
-                        run_meta = save_result_to_db(result_df, header)
-                        if run_meta:
-                            st.success(
-                                f"Saved to local database '{DB_PATH.name}' (run id {run_meta['run_id']}). Dashboard will use this automatically.")
-                    except Exception as db_err:
-                        st.warning(f"Failed to save to database: {db_err}")
-
-                    st.download_button(
-                        label="📥 Download Result File",
-                        data=processed_data,
-                        file_name=f"processed_result{ext}",
-                        mime=mime_type,
-                        key="download_button",
-                    )
+            engine = OUTPUT_ENGINES[0]
+            if not template_file.name.lower().endswith(".xlsm"):
+                engine_label = st.radio(
+                    "Result workbook:",
+                    options=["Keep template formatting", "Fast (no formatting)"],
+                    horizontal=True,
+                    help="Fast writes the result row by row with constant memory; values and formulas are kept, formatting is not. "
+                    "Macro-enabled (.xlsm) templates always keep their formatting and macros.",
+                    key="output_engine_radio",
+                )
+                engine = OUTPUT_ENGINES[1] if engine_label == "Fast (no formatting)" else OUTPUT_ENGINES[0]
+
+            if st.button("🚀 Process Now!", key="process_button"):
+                from jobs import submit_job
+
+                # Proses berjalan di thread latar belakang; sesi ini hanya memantau status job
+                ext = ".xlsm" if template_file.name.lower().endswith(".xlsm") else ".xlsx"
+                st.session_state.last_processed_ext = ext
+                job_id = submit_job(
+                    f"processed_result{ext}",
+                    template_file.getvalue(),
+                    [(source.getvalue(), target, mode) for source, target, mode in jobs],
+                    max_workers=int(max_workers),
+                    trace_memory=st.session_state.get("profile_trace_memory", False),
+                    parse_cache=parse_cache,
+                    aggregations=aggregations,
+                    source_names=[source.name for source, _, _ in jobs],
+                    engine=engine,
+                )
+                st.session_state.active_job = job_id
+                # Simpan id job di URL agar bisa dilanjutkan setelah browser di-refresh
+                st.query_params["job"] = job_id
         except Exception as e:
             st.error(f"An error occurred: {e}")
             st.warning("Make sure the uploaded Excel files are valid and the template contains a sheet named 'Master Sheet'.")
     else:
         st.info("Please upload both Excel files to begin.")
 
+    job_id = st.session_state.get("active_job") or st.query_params.get("job")
+    if job_id:
+        render_job(job_id)
+
+
+# Streamlit 1.52+ accepts a callable as download data and only calls it when the button is clicked
+DEFERRED_DOWNLOADS = tuple(int(part) for part in st.__version__.split(".")[:2]) >= (1, 52)
+
+def deferred_download(build):
+    """Download data that is built on click where supported, otherwise right away."""
+    return build if DEFERRED_DOWNLOADS else build()
+
+JOB_POLL_SECONDS = 1.0
+JOB_STATUS_LABELS = {"queued": "Waiting for a free worker", "running": "Processing", "done": "Finished", "failed": "Failed"}
+
+def _job_progress(job_id: str):
+    """Progress of a queued/running job; re-polled every JOB_POLL_SECONDS, full rerun once it finishes."""
+    from jobs import JOB_STAGES, get_job
+
+    job = get_job(job_id)
+    if job is None or job["status"] not in ("queued", "running"):
+        st.rerun()
+    done = min(job["stages_done"], len(JOB_STAGES))
+    stage = f" — {job['stage'].replace('_', ' ')}" if job["stage"] else ""
+    rows = f" ({job['rows']:,} rows)" if job["rows"] else ""
+    st.progress(done / len(JOB_STAGES), text=f"{JOB_STATUS_LABELS[job['status']]}{stage}{rows}")
+    st.caption("You can keep using the app or refresh the page; the job continues in the background.")
+    if not hasattr(st, "fragment"):
+        st.button("🔄 Refresh status", key="job_refresh")
+
+if hasattr(st, "fragment"):
+    _job_progress = st.fragment(run_every=JOB_POLL_SECONDS)(_job_progress)
+
+def render_job(job_id: str):
+    """Status of a background job; preview, database summary and download once it is done."""
+    from jobs import get_job, get_result_frame, read_result, result_available
+    from storage import DB_PATH
+
+    st.subheader("4. Result")
+    job = get_job(job_id)
+    if job is None:
+        st.warning("This processing job is no longer available.")
+        return
+    if job["status"] in ("queued", "running"):
+        _job_progress(job_id)
+        return
+
+    st.session_state.input_profile = job["profile"]
+    if job["status"] == "failed":
+        st.error(f"An error occurred: {job['error']}")
+        st.warning("Make sure the uploaded Excel files are valid and the template contains a sheet named 'Master Sheet'.")
+        return
+
+    result = job["result"] or {}
+    result_df = get_result_frame(job_id)
+    if result_df is None and job["run_id"] is not None:
+        loaded = cached_run(job["run_id"])
+        result_df = loaded["df"] if loaded else None
+    if result_df is not None:
+        st.session_state.result_df = result_df
+        st.write("Data processed successfully. Here is a preview of the result:")
+        st.dataframe(result_df.fillna(''))
+
+    run_meta = result.get("run")
+    if run_meta:
+        st.success(f"Saved to local database '{DB_PATH.name}' (run id {run_meta['run_id']}). Dashboard will use this automatically.")
+        st.caption(
+            f"Database write ({run_meta['storage']} snapshot): {run_meta['rows_written']:,} values "
+            f"at {run_meta['rows_per_sec']:,.0f} rows/s.")
+    elif result.get("db_error"):
+        st.warning(f"Failed to save to database: {result['db_error']}")
+    for info in result.get("incremental", []):
+        if info["full_recount"]:
+            st.caption(
+                f"Incremental '{info['source']}' → {info['target']}: counted all {info['total_rows']:,} rows ({info['reason']})."
+            )
+        else:
+            st.caption(
+                f"Incremental '{info['source']}' → {info['target']}: counted {info['new_rows']:,} new rows "
+                f"of {info['total_rows']:,}."
+            )
+
+    # Bytes unduhan baru dibuat saat tombol diklik (jika Streamlit mendukung data berupa callable)
+    if result_available(job):
+        mime_type = (
+            "application/vnd.ms-excel.sheet.macroEnabled.12"
+            if job["result_name"].endswith(".xlsm")
+            else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        st.download_button(
+            label="📥 Download Result File",
+            data=deferred_download(lambda: read_result(job)),
+            file_name=job["result_name"],
+            mime=mime_type,
+            key="download_button",
+        )
+    else:
+        st.info("The result file of this job has been removed; process the files again to download it.")
+
+    if result_df is not None:
+        from exports import EXPORT_FORMATS, available_formats, export_result
+
+        stem = job["result_name"].rsplit(".", 1)[0]
+        export_columns = st.columns(len(available_formats()))
+        for column, fmt in zip(export_columns, available_formats()):
+            extension, mime = EXPORT_FORMATS[fmt]
+            with column:
+                st.download_button(
+                    label=f"⬇️ Download table as {fmt.upper()}",
+                    data=deferred_download(lambda fmt=fmt: export_result(result_df, fmt)),
+                    file_name=f"{stem}{extension}",
+                    mime=mime,
+                    key=f"download_{fmt}",
+                    help="Values only (no formatting), for other systems.",
+                )
+
+
+def render_performance(profile: dict | None, page: str):
+    with st.expander("⏱️ Performance", expanded=False):
+        if page == "input":
+            st.checkbox(
+                "Trace memory on the next run (slower)",
+                key="profile_trace_memory",
+                help="Also record the peak Python memory of every stage.",
+            )
+        if not profile or not profile["spans"]:
+            st.caption("No timings recorded yet.")
+        else:
+            st.caption(f"{'Last processing run' if page == 'input' else 'Data loads of this view'}: {profile['total_seconds']:.3f}s in total.")
+            st.dataframe(profile["spans"], use_container_width=True)
+            st.download_button(
+                "⬇️ Download profile (JSON)",
+                data=json.dumps(profile, indent=2, default=str),
+                file_name=f"profile_{page}.json",
+                mime="application/json",
+                key=f"profile_download_{page}",
+            )
+        memory = st.session_state.get("memory_report")
+        if memory:
+            st.caption(
+                f"Memory of the current dataset ({memory['rows']:,} rows): {memory['before_mib']:,.2f} MiB as a "
+                f"float64/object table, {memory['after_mib']:,.2f} MiB compact and shared by all sessions "
+                f"(saved {memory['before_mib'] - memory['after_mib']:,.2f} MiB per session)."
+                + (f" Dropped empty columns: {', '.join(memory['dropped_columns'])}." if memory["dropped_columns"] else "")
+            )
+        if page == "input" and st.checkbox("Show recent runs", key="profile_show_recent"):
+            from storage import load_run_profiles
+
+            recent = load_run_profiles(limit_runs=20)
+            if recent.empty:
+                st.caption("No profiled runs stored yet.")
+            else:
+                st.markdown("Recent runs — seconds per stage")
+                st.dataframe(
+                    recent.pivot_table(index=["run_id", "created_at"], columns="stage", values="seconds", aggfunc="sum", sort=False),
+                    use_container_width=True,
+                )
+
 
 # --- Router ---
 def render_guide():
@@ -567,7 +827,7 @@ def render_guide():
 1. Open: [fillmastersheet.streamlit.app](https://fillmastersheet.streamlit.app/)
 2. Go to the "Data Input" menu.
 3. Upload Source File (.xlsx) and Template File (.xlsx/.xlsm).
-4. Choose the target column and mode (Add/Replace), then click "Process Now!".
+4. Choose the target column and mode (Add/Replace), then click "Process Now!". Use "Batch (multiple files)" to fill several columns in one run.
 5. Download the result (extension follows the template; .xlsm preserves macros).
 6. Go to the "Dashboard" menu to explore data: Overview, Top/Bottom, Matrix, and Company Profile.
 """)
@@ -584,7 +844,8 @@ This app helps you:
         st.markdown("""
 ### 2.1. Source File (Raw Data)
 - Format: .xlsx
-- Header is expected on the second row (this code uses `header=1`).
+- Header is expected on the second row; the first sheet of the workbook is used.
+- The file is streamed row by row and only the three columns below are read, so very large exports are fine.
 - Minimum required columns:
   - `Student Code` and `Course Code` (rows with missing values in either will be ignored)
   - `Site Name` (company/partner name)
@@ -598,28 +859,52 @@ This app helps you:
 - The header row is assumed to be the first row of the sheet.
 """)
 
-    with st.expander("3. Processing Mode: Add vs Replace"):
+    with st.expander("3. Processing Mode: Add, Replace and Incremental"):
         st.markdown("""
 - Add: the target column values will be incremented by the new counts.
   - Example: old value 10, new count 3 → stored 13.
 - Replace: the target column values will be replaced by the new counts.
   - Example: old value 10, new count 3 → stored 3.
+- Incremental: for a source export that only grows (an enrolment log), only the rows added since the last
+  Incremental run of the same file name and target column are counted. They are added to the stored running total,
+  and the target column is set to that total.
+  - Example: last run counted 100 rows (total 10 for a company); the export now has 120 rows with 2 new ones for that
+    company → only the 20 new rows are counted and 12 is stored.
+  - If earlier rows of the export changed (or the aggregation changed, or it counts distinct students/pairs), the
+    whole file is counted again. Processing the same file twice never counts a row twice.
+  - Several Incremental sources for the same target column are added together (e.g. one log per campus).
 - If a company is not present in the template, a new row will be added automatically.
+
+What is counted per company can be chosen next to the mode (only rows with a Student Code and Course Code are used):
+- Count rows: every row counts (the default).
+- Distinct students: each Student Code counts once per company, so duplicate enrolment rows are ignored.
+- Distinct student-course pairs: each (Student Code, Course Code) counts once per company.
+- Sum of column: adds up a numeric column of the source file; non-numeric cells count as 0.
 """)
 
     with st.expander("4. Steps in the Data Input Menu", expanded=True):
         st.markdown("""
+Choose "Single file" (one source file, one target column) or "Batch (multiple files)". In batch mode each uploaded
+source file gets its own target column and mode; all of them are applied in upload order to one template, which is
+saved and stored in the database only once. "Parallel workers" controls how many source files are parsed at the
+same time; the result is the same as processing them one by one.
+""")
+        st.markdown("""
 1) Upload the Source File (.xlsx).
 2) Upload the Template File (.xlsx or .xlsm) that contains a `Master Sheet`.
 3) Select the target column (from the `Master Sheet` header) to receive the counts.
-4) Choose the Mode (Add/Replace).
-5) Click "Process Now!" and wait for the preview to appear.
+4) Choose the Mode (Add/Replace/Incremental) and what to count (rows, distinct students, distinct student-course pairs or the sum of a column).
+5) Click "Process Now!". Processing runs in the background with a progress bar; you can refresh the page (the job id is kept in the URL) and the result appears when it is done. Jobs from several users run side by side, a few at a time.
 6) Download the result using the Download button. Extension follows the template (if template is .xlsm the result will also be .xlsm and macros are preserved).
+   The result table can also be downloaded as CSV or Parquet (values only, for other systems).
 
 Technical notes when saving to the template:
 - The app reads all headers from the first row of `Master Sheet`.
 - It finds company rows by matching the first column.
-- If not found, a new row is inserted at the end and all header columns are filled.
+- Only the target column cells of matched companies are rewritten (other cells, formulas and formatting are left untouched).
+- Companies that are not found are appended together after the last row.
+- For .xlsx templates, "Result workbook: Fast (no formatting)" writes a new workbook row by row with constant memory
+  instead: the same cells are updated and every sheet keeps its values and formulas, but formatting is not copied.
 """)
 
     with st.expander("5. Steps in the Dashboard Menu"):
@@ -645,14 +930,26 @@ Technical notes when saving to the template:
 5.4 Company Profile
 - Select one company to view all available category values.
 - Radar or bar chart (fallback) will be displayed.
+
+5.5 History
+- Uses every run stored in the local database (each "Process Now!" creates a run).
+- Total per run for the selected category over the last N runs, with the change from the previous run.
+- Partner History: one company's values across runs and the change per category since its previous run.
+
+5.6 Performance
+- The "⏱️ Performance" expander below the Dashboard and Data Input pages shows how long each stage took.
+- Data Input stores the stage timings with every run; "Show recent runs" compares them, and the JSON download exports one profile.
+- It also shows the memory of the current dataset: the Dashboard keeps one compact copy per dataset (small integer types,
+  non-numeric markers in a separate mask) that all sessions share.
 """)
 
     with st.expander("6. Tips, Limitations, and Best Practices"):
         st.markdown("""
-- Non-numeric values in category columns are treated as 0 for Dashboard visuals. Convert them first if you want them counted (e.g. `Y` → 1).
+- Non-numeric values in category columns are treated as 0 for Dashboard visuals (the Company Profile marks them). Convert them first if you want them counted (e.g. `Y` → 1).
+- Columns without a header and without any value are ignored by the Dashboard.
 - Ensure exact column names (case-sensitive) for `Student Code`, `Course Code`, `Site Name` in the source file.
 - For large files, keep them on local disk (not a network drive) for performance.
-- Avoid duplicate company names in the template; if present, the first matching row will be updated.
+- Company names are matched ignoring case, surrounding spaces and full-width characters. Avoid duplicate company names in the template; the app lists them after upload and updates the first matching row.
 - Keep a backup of the template before overwriting, especially for `.xlsm` files with important macros.
 """)
 
@@ -671,6 +968,7 @@ Technical notes when saving to the template:
   - Removing unnecessary sheets
   - Compressing or summarizing the source data
 - If uploads are slow or fail, check your internet connection and retry.
+- Uploaded files are parsed once: changing a dropdown or clicking "Process Now!" again with the same files reuses the parsed data.
 - Recommended browsers: modern Chrome or Edge.
 """)
 
@@ -684,20 +982,31 @@ Optional commands to run locally on Windows PowerShell:
 # Run the app
 streamlit run "c:\\Users\\PRIMA\\OneDrive\\Documents\\PROJECT\\0 TRIAL\\Project Fill in Master sheet\\app.py"
 ```
+
+Headless (no browser, e.g. for scheduled jobs):
+```powershell
+python cli.py source.xlsx --template master.xlsm --target "Column Name" --mode add
+python cli.py --template master.xlsm --job jan.xlsx "Column A" add --job feb.xlsx "Column B" replace --workers 4
+python cli.py source.xlsx --template master.xlsm --target "Column Name" --aggregate students
+python cli.py source.xlsx --template master.xlsx --target "Column Name" --engine streaming --export result.csv
+```
 """)
 
     with st.expander("10. FAQ"):
         st.markdown("""
 - Do categories need to be defined manually? No. Categories are read automatically from the `Master Sheet` header (except the first column).
 - Are macros removed when saving? No, `.xlsm` macros are preserved (`keep_vba=True`).
-- Can I change the source header row? Currently the code expects the header on row 2 (`header=1`). Adjust code if different.
+- Can I change the source header row? Currently the code expects the header on row 2 (`SOURCE_HEADER_ROW`). Adjust code if different.
 """)
 
 
 if menu == "Dashboard":
     render_dashboard()
+    dashboard_profiler = st.session_state.get("dashboard_profile")
+    render_performance(dashboard_profiler.to_dict() if dashboard_profiler else None, "dashboard")
 elif menu == "Data Input":
     render_input()
+    render_performance(st.session_state.get("input_profile"), "input")
 else:
     render_guide()
 
@@ -0,0 +1,163 @@
+"""Time and peak-memory benchmark of every pipeline stage on synthetic data.
+
+Usage:
+    python benchmarks/run_benchmarks.py --rows 200000 --sites 5000 --template-rows 4000 --categories 15 --output bench.json
+
+Each stage is run `--repeat` times and the fastest run is reported. Peak memory is measured with tracemalloc
+(Python allocations only) and can be switched off with --no-memory, which also removes its overhead from the timings.
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import openpyxl  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import storage  # noqa: E402
+from benchmarks.synthetic import make_source, make_template  # noqa: E402
+from compaction import compact_dataset  # noqa: E402
+from processing import (  # noqa: E402
+    apply_site_counts,
+    count_sites,
+    count_sites_from_excel,
+    write_result_to_sheet,
+    write_streaming_workbook,
+)
+
+
+def measure(func, repeat=1, memory=True):
+    """Run func `repeat` times; return (last result, best seconds, peak MiB of the best run or None)."""
+    best_seconds, best_peak, result = None, None, None
+    for _ in range(repeat):
+        if memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - started
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        if best_seconds is None or seconds < best_seconds:
+            best_seconds, best_peak = seconds, peak
+    return result, best_seconds, best_peak
+
+
+def run(args):
+    workdir = Path(tempfile.mkdtemp(prefix="mastersheet-bench-"))
+    suffix = ".xlsm" if args.xlsm else ".xlsx"
+    source_path = make_source(workdir / "source.xlsx", rows=args.rows, sites=args.sites, missing_ratio=args.missing_ratio, seed=args.seed)
+    template_path = make_template(workdir / f"template{suffix}", rows=args.template_rows, categories=args.categories, seed=args.seed)
+    db_path = workdir / "bench.db"
+    target_column = "Category 1"
+    stages = []
+
+    def stage(name, func, rows=None):
+        result, seconds, peak = measure(func, repeat=args.repeat, memory=not args.no_memory)
+        entry = {"stage": name, "seconds": round(seconds, 6), "peak_mib": None if peak is None else round(peak, 3)}
+        if rows:
+            entry["rows"] = rows
+            entry["rows_per_sec"] = round(rows / seconds, 1) if seconds > 0 else None
+        stages.append(entry)
+        print(f"{name:<24} {seconds:9.3f}s" + ("" if peak is None else f" {peak:10.1f} MiB"), file=sys.stderr)
+        return result
+
+    stage("excel_read_source", lambda: count_sites(_read_source(source_path)), rows=args.rows)
+    site_counts = stage("stream_count_source", lambda: count_sites_from_excel(source_path), rows=args.rows)
+    template_df = stage("excel_read_template", lambda: pd.read_excel(template_path, sheet_name="Master Sheet"), rows=args.template_rows)
+    result_df = stage("process_data", lambda: apply_site_counts(template_df, site_counts, target_column, args.mode), rows=len(site_counts))
+
+    def write_back():
+        wb = openpyxl.load_workbook(template_path, keep_vba=True)
+        ws = wb["Master Sheet"]
+        header = [cell.value for cell in ws[1]]
+        write_result_to_sheet(ws, result_df, {target_column: site_counts.index})
+        output = io.BytesIO()
+        wb.save(output)
+        return header
+
+    header = stage("openpyxl_write_back", write_back, rows=len(result_df))
+    if suffix == ".xlsx":
+        stage(
+            "streaming_write_back",
+            lambda: write_streaming_workbook(template_path, result_df, {target_column: site_counts.index}, workdir / "streaming.xlsx"),
+            rows=len(result_df),
+        )
+    cells = len(result_df) * (len(header) - 1)
+    stage("save_result_to_db", lambda: storage.save_result_to_db(result_df, header, db_path=db_path), rows=cells)
+    stage("load_latest_from_db", lambda: storage.load_latest_from_db(db_path), rows=cells)
+    loaded = stage("load_latest_from_sqlite", lambda: _load_without_snapshot(db_path), rows=cells)
+    compact = stage("compact_dataset", lambda: compact_dataset(loaded["df"]), rows=cells)
+    stages[-1].update(nbytes=compact["nbytes_before"], compact_nbytes=compact["nbytes_after"])
+
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "openpyxl": openpyxl.__version__,
+        "params": {
+            "rows": args.rows,
+            "sites": args.sites,
+            "missing_ratio": args.missing_ratio,
+            "template_rows": args.template_rows,
+            "categories": args.categories,
+            "format": suffix,
+            "mode": args.mode,
+            "repeat": args.repeat,
+            "memory": not args.no_memory,
+            "seed": args.seed,
+        },
+        "stages": stages,
+    }
+
+
+def _load_without_snapshot(db_path):
+    # Rebuild from master_values even when an Arrow snapshot exists
+    enabled, storage.SNAPSHOTS_ENABLED = storage.SNAPSHOTS_ENABLED, False
+    try:
+        return storage.load_latest_from_db(db_path)
+    finally:
+        storage.SNAPSHOTS_ENABLED = enabled
+
+
+def _read_source(path):
+    source_df = pd.read_excel(path, header=1)
+    source_df.columns = source_df.columns.str.strip()
+    return source_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Master Sheet pipeline on synthetic data.")
+    parser.add_argument("--rows", type=int, default=50_000, help="Rows in the synthetic source export.")
+    parser.add_argument("--sites", type=int, default=2_000, help="Distinct Site Name values in the source.")
+    parser.add_argument("--missing-ratio", type=float, default=0.05, help="Share of rows missing Student/Course Code.")
+    parser.add_argument("--template-rows", type=int, default=1_500, help="Partner rows in the template.")
+    parser.add_argument("--categories", type=int, default=12, help="Category columns in the template.")
+    parser.add_argument("--xlsm", action="store_true", help="Generate a macro-enabled .xlsm template (with a placeholder VBA part) instead of .xlsx.")
+    parser.add_argument("--mode", default="Add (Tambah)", choices=["Add (Tambah)", "Replace (Ganti)"])
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is reported.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak-memory measurement.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here (default: stdout).")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
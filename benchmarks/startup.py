@@ -0,0 +1,102 @@
+"""Cold-start benchmark of the Streamlit app: first render and rerun time per page in a fresh interpreter.
+
+Usage:
+    python benchmarks/startup.py --repeat 3 --output startup.json
+
+Every measurement runs in a new Python process (like a new container or server start) and renders one
+page with streamlit.testing's AppTest. The report lists, per page, the fastest process start-to-render
+time, the first render and a rerun (new session on a warm process), plus which heavy libraries the page
+imported. The Dashboard is measured in whatever state the local database is in.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+PAGES = ["User Guide", "Data Input", "Dashboard"]
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "plotly", "pyarrow", "sqlite3")
+
+
+def _child(page):
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    import_seconds = time.perf_counter() - started
+    # AppTest itself imports some libraries (e.g. plotly); only report what the page added
+    before = set(sys.modules)
+
+    at = AppTest.from_file(str(APP_PATH), default_timeout=120)
+    at.session_state["menu"] = page
+    started = time.perf_counter()
+    at.run()
+    first_render_seconds = time.perf_counter() - started
+
+    rerun = AppTest.from_file(str(APP_PATH), default_timeout=120)
+    rerun.session_state["menu"] = page
+    started = time.perf_counter()
+    rerun.run()
+    new_session_seconds = time.perf_counter() - started
+
+    loaded = {name.split(".")[0] for name in set(sys.modules) - before}
+    print(json.dumps({
+        "page": page,
+        "streamlit_import_seconds": round(import_seconds, 6),
+        "first_render_seconds": round(first_render_seconds, 6),
+        "new_session_seconds": round(new_session_seconds, 6),
+        "exceptions": [str(e.value) for e in at.exception],
+        "heavy_modules": sorted(loaded.intersection(HEAVY_MODULES)),
+    }))
+
+
+def measure_page(page, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", page], capture_output=True, text=True, check=True, cwd=APP_PATH.parent
+        )
+        process_seconds = time.perf_counter() - started
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result["process_seconds"] = round(process_seconds, 6)
+        if best is None or result["process_seconds"] < best["process_seconds"]:
+            best = result
+        print(f"{page:<12} {process_seconds:7.3f}s process  {result['first_render_seconds']:7.3f}s first render", file=sys.stderr)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the Master Sheet Streamlit app.")
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES, help="Pages to measure.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per page; the fastest is reported.")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here (default: stdout).")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child)
+        return 0
+
+    import streamlit
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "params": {"repeat": args.repeat},
+        "pages": [measure_page(page, args.repeat) for page in args.pages],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Synthetic source exports and Master Sheet templates for benchmarking.
+
+Files are written with openpyxl's write-only mode so that large inputs can be generated quickly.
+"""
+import random
+import zipfile
+from pathlib import Path
+
+import openpyxl
+
+SOURCE_HEADER = ["No", "Student Code", "Student Name", "Course Code", "Course Name", "Site Name", "Region"]
+
+# Size of the placeholder VBA part of generated .xlsm templates (typical for a workbook with a few modules)
+VBA_PROJECT_BYTES = 64 * 1024
+_XLSX_MAIN_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"
+_XLSM_MAIN_TYPE = "application/vnd.ms-excel.sheet.macroEnabled.main+xml"
+_VBA_CONTENT_TYPE = "application/vnd.ms-office.vbaProject"
+_VBA_RELATIONSHIP = "http://schemas.microsoft.com/office/2006/relationships/vbaProject"
+
+
+def site_names(count):
+    return [f"Partner {i:05d}" for i in range(count)]
+
+
+def make_source(path, rows=10_000, sites=500, missing_ratio=0.05, seed=0):
+    """Write a raw export: a title on row 1, the header on row 2 and `rows` enrolment rows.
+
+    About `missing_ratio` of the rows miss their Student Code or Course Code and must be ignored by the counting.
+    """
+    rng = random.Random(seed)
+    names = site_names(sites)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    ws.append(["Enrolment export (synthetic)"])
+    ws.append(SOURCE_HEADER)
+    for i in range(rows):
+        student = f"STU{rng.randrange(rows * 2):08d}"
+        course = f"CRS{rng.randrange(200):04d}"
+        if rng.random() < missing_ratio:
+            if rng.random() < 0.5:
+                student = None
+            else:
+                course = None
+        ws.append([i + 1, student, "Student", course, "Course", rng.choice(names), "Region"])
+    path = Path(path)
+    wb.save(path)
+    return path
+
+
+def placeholder_vba_project(size=VBA_PROJECT_BYTES):
+    """Bytes standing in for xl/vbaProject.bin: a compound-file signature padded with zeros.
+
+    openpyxl copies the part verbatim with keep_vba=True, so it exercises the same load/save path as a real
+    project of that size, but it holds no macros and Excel would not run it.
+    """
+    signature = bytes.fromhex("d0cf11e0a1b11ae1")
+    return signature + bytes(max(size - len(signature), 0))
+
+
+def _add_vba_project(path, vba_project):
+    # Jadikan paket macro-enabled: tipe konten workbook .xlsm, part VBA dan relasinya dari workbook
+    with zipfile.ZipFile(path) as archive:
+        parts = {info.filename: archive.read(info) for info in archive.infolist()}
+    content_types = parts["[Content_Types].xml"].decode("utf-8")
+    content_types = content_types.replace(_XLSX_MAIN_TYPE, _XLSM_MAIN_TYPE)
+    content_types = content_types.replace("</Types>", f'<Default Extension="bin" ContentType="{_VBA_CONTENT_TYPE}"/></Types>')
+    parts["[Content_Types].xml"] = content_types.encode("utf-8")
+    rels = parts["xl/_rels/workbook.xml.rels"].decode("utf-8")
+    rels = rels.replace(
+        "</Relationships>", f'<Relationship Id="rIdVBA" Type="{_VBA_RELATIONSHIP}" Target="vbaProject.bin"/></Relationships>'
+    )
+    parts["xl/_rels/workbook.xml.rels"] = rels.encode("utf-8")
+    parts["xl/vbaProject.bin"] = vba_project
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+
+
+def make_template(path, rows=1_000, categories=12, marker_ratio=0.02, blank_ratio=0.2, seed=0, vba_project=None):
+    """Write a template with a 'Master Sheet': partner names in column A and `categories` value columns.
+
+    Values are small integers, with some blanks and some non-numeric markers (`Y`). A `.xlsm` path produces a
+    macro-enabled package with xl/vbaProject.bin (`vba_project`, by default placeholder_vba_project()), so
+    loads with keep_vba=True carry and save a VBA part as for a real template.
+    """
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Master Sheet")
+    ws.append(["Partner Name"] + [f"Category {i + 1}" for i in range(categories)])
+    for name in site_names(rows):
+        values = []
+        for _ in range(categories):
+            r = rng.random()
+            if r < blank_ratio:
+                values.append(None)
+            elif r < blank_ratio + marker_ratio:
+                values.append("Y")
+            else:
+                values.append(rng.randrange(50))
+        ws.append([name] + values)
+    path = Path(path)
+    wb.save(path)
+    if path.suffix.lower() == ".xlsm":
+        _add_vba_project(path, placeholder_vba_project() if vba_project is None else vba_project)
+    return path
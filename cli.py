@@ -0,0 +1,183 @@
+"""Headless entry point: fill a Master Sheet template from source exports without Streamlit.
+
+Examples:
+    python cli.py export.xlsx --template master.xlsm --target "Course A" --mode add
+    python cli.py --template master.xlsm --job jan.xlsx "Course A" add --job feb.xlsx "Course B" replace --workers 4
+    python cli.py export.xlsx --template master.xlsm --target "Students" --mode replace --aggregate students
+    python cli.py enrolments.xlsx --template master.xlsm --target "Course A" --mode incremental
+    python cli.py export.xlsx --template master.xlsx --target "Course A" --engine streaming --export result.parquet
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from exports import PARQUET_AVAILABLE, export_result
+from processing import AGGREGATIONS, OUTPUT_ENGINES, SHEET_FIRST_DATA_ROW, UPDATE_MODES, count_sources, fill_template
+from profiling import Profiler, span
+from site_index import SiteIndex
+from storage import DB_PATH, save_result_to_db, save_run_profile
+from watermarks import commit_watermarks, count_jobs, source_key
+
+MODE_ALIASES = {"add": UPDATE_MODES[0], "replace": UPDATE_MODES[1], "incremental": UPDATE_MODES[2]}
+AGGREGATION_ALIASES = {"rows": AGGREGATIONS[0], "students": AGGREGATIONS[1], "pairs": AGGREGATIONS[2], "sum": AGGREGATIONS[3]}
+
+
+def _parse_mode(value):
+    mode = MODE_ALIASES.get(value.strip().lower())
+    if mode is None:
+        raise argparse.ArgumentTypeError(f"invalid mode '{value}' (choose from: {', '.join(MODE_ALIASES)})")
+    return mode
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Count source rows per Site Name and write them into a Master Sheet template.")
+    parser.add_argument("sources", nargs="*", type=Path, help="Source .xlsx files applied to --target with --mode.")
+    parser.add_argument("--template", required=True, type=Path, help="Template workbook (.xlsx/.xlsm) with a 'Master Sheet'.")
+    parser.add_argument("--target", help="Target column in 'Master Sheet' for the positional sources.")
+    parser.add_argument("--mode", default="add", help="Update mode for the positional sources: add, replace or incremental (default: add).")
+    parser.add_argument(
+        "--job",
+        nargs=3,
+        action="append",
+        default=[],
+        metavar=("SOURCE", "TARGET", "MODE"),
+        help="Additional (source, target column, mode) job; may be repeated. Jobs run after the positional sources.",
+    )
+    parser.add_argument(
+        "--aggregate",
+        default="rows",
+        choices=list(AGGREGATION_ALIASES),
+        help="What to count per Site Name for every job: rows, distinct students, distinct student-course pairs or "
+        "the sum of --sum-column (default: rows).",
+    )
+    parser.add_argument("--sum-column", help="Source column added up with --aggregate sum.")
+    parser.add_argument(
+        "--engine",
+        default=OUTPUT_ENGINES[0],
+        choices=OUTPUT_ENGINES,
+        help="Workbook writer: openpyxl keeps the template's formatting and macros; streaming keeps values and "
+        "formulas but not formatting, with constant memory (.xlsx templates without macros). Default: openpyxl.",
+    )
+    parser.add_argument(
+        "--export",
+        type=Path,
+        action="append",
+        default=[],
+        help="Also write the result table to this .csv or .parquet file (values only); may be repeated.",
+    )
+    parser.add_argument("--output", type=Path, help="Output workbook (default: <template>_processed.<ext> next to the template).")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes used to parse source files (default: 1).")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help=f"SQLite database for the run (default: {DB_PATH.name}).")
+    parser.add_argument("--no-db", action="store_true", help="Do not store the run in the database.")
+    parser.add_argument("--profile", type=Path, help="Write the stage timings of this run as JSON to this file.")
+    parser.add_argument("--trace-memory", action="store_true", help="Also record the peak Python memory per stage (slower).")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    jobs = []
+    if args.sources:
+        if not args.target:
+            parser.error("--target is required when source files are given positionally")
+        mode = _parse_mode(args.mode)
+        jobs.extend((source, args.target, mode) for source in args.sources)
+    for source, target, mode in args.job:
+        try:
+            jobs.append((Path(source), target, _parse_mode(mode)))
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+    if not jobs:
+        parser.error("no source files given (use positional sources or --job)")
+    if args.aggregate == "sum" and not args.sum_column:
+        parser.error("--sum-column is required with --aggregate sum")
+    aggregation = (AGGREGATION_ALIASES[args.aggregate], args.sum_column if args.aggregate == "sum" else None)
+
+    export_formats = {".csv": "csv", ".parquet": "parquet"}
+    unknown_exports = [str(path) for path in args.export if path.suffix.lower() not in export_formats]
+    if unknown_exports:
+        parser.error(f"unsupported export file type(s) (use .csv or .parquet): {', '.join(unknown_exports)}")
+    if not PARQUET_AVAILABLE and any(path.suffix.lower() == ".parquet" for path in args.export):
+        parser.error("Parquet export needs pyarrow (pip install pyarrow)")
+
+    output = args.output or args.template.with_name(f"{args.template.stem}_processed{args.template.suffix}")
+    if args.engine == "streaming" and ".xlsm" in (args.template.suffix.lower(), output.suffix.lower()):
+        parser.error("--engine streaming writes .xlsx workbooks without macros; use --engine openpyxl for .xlsm")
+
+    missing = [str(path) for path in [args.template] + [source for source, _, _ in jobs] if not path.exists()]
+    if missing:
+        parser.error(f"file(s) not found: {', '.join(missing)}")
+
+    profiler = Profiler("cli", trace_memory=args.trace_memory)
+    with span(profiler, "read_template"):
+        template_df = pd.read_excel(args.template, sheet_name="Master Sheet")
+    # Header Excel bisa berupa angka/tanggal; cocokkan nama kolom dari command line sebagai teks
+    columns_by_name = {str(col): col for col in template_df.columns}
+    unknown = sorted({target for _, target, _ in jobs if target not in columns_by_name})
+    if unknown:
+        parser.error(f"target column(s) not found in 'Master Sheet': {', '.join(unknown)}")
+    jobs = [(source, columns_by_name[target], mode) for source, target, mode in jobs]
+
+    site_index = SiteIndex(template_df[template_df.columns[0]])
+    if site_index.has_duplicates:
+        # Baris DataFrame ke-0 ada di baris Excel ke-2 (baris 1 adalah header)
+        for _, dup in site_index.duplicates(offset=SHEET_FIRST_DATA_ROW).iterrows():
+            print(f"warning: duplicate company name {dup['name']!r} in row {dup['position']}", file=sys.stderr)
+
+    with span(profiler, "count_sources", files=len(jobs), workers=args.workers):
+        site_counts, pending_watermarks = count_jobs(
+            [source for source, _, _ in jobs],
+            jobs,
+            [source_key(source) for source, _, _ in jobs],
+            [aggregation] * len(jobs),
+            lambda files, file_aggregations: count_sources(files, max_workers=args.workers, aggregations=file_aggregations),
+            db_path=args.db,
+        )
+    result_df, header, _ = fill_template(
+        args.template,
+        jobs,
+        template_df=template_df,
+        site_counts=site_counts,
+        site_index=site_index,
+        profiler=profiler,
+        engine=args.engine,
+        output=output,
+    )
+    print(f"Wrote {output} ({len(result_df)} rows, {len(jobs)} job(s)).")
+    for path in args.export:
+        with span(profiler, "export", format=export_formats[path.suffix.lower()]):
+            export_result(result_df, export_formats[path.suffix.lower()], path)
+        print(f"Wrote {path}.")
+    for _, _, _, info in pending_watermarks:
+        if info["full_recount"]:
+            counted = f"all {info['total_rows']:,} rows ({info['reason']})"
+        else:
+            counted = f"{info['new_rows']:,} new rows of {info['total_rows']:,}"
+        print(f"Incremental {info['source']} -> {info['target']}: counted {counted}.")
+    if pending_watermarks and args.no_db:
+        print("Watermarks not saved (--no-db); the next incremental run counts these files again.")
+
+    if not args.no_db:
+        commit_watermarks(pending_watermarks, db_path=args.db)
+        with span(profiler, "save_result_to_db"):
+            run_meta = save_result_to_db(result_df, header, db_path=args.db)
+        if run_meta:
+            save_run_profile(run_meta["run_id"], profiler.to_dict(), db_path=args.db)
+            print(
+                f"Saved run {run_meta['run_id']} to {args.db} ({run_meta['storage']}, {run_meta['rows_written']:,} values, "
+                f"{run_meta['rows_per_sec']:,.0f} rows/s)."
+            )
+
+    profiler.log()
+    if args.profile:
+        args.profile.write_text(profiler.to_json(indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote profile to {args.profile} ({profiler.total_seconds:.3f}s in total).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
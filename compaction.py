@@ -0,0 +1,67 @@
+"""Compact in-memory frames for the Dashboard and the Data Input page.
+
+A loaded template or run is converted once per dataset and shared by all sessions. The Dashboard no longer
+works on a per-session float64/object copy:
+- site names become a categorical when that is smaller;
+- columns without a header and without values are dropped;
+- every category is coerced to numbers once, with integers downcast to the smallest exact dtype;
+- non-numeric markers such as "Y" go to a separate boolean mask.
+"""
+import pandas as pd
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Memory of a frame including its index and the Python objects it references."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _categorize(values: pd.Series) -> pd.Series:
+    # Kategori hanya dipakai jika lebih kecil (nama site di template biasanya unik)
+    categorical = values.astype("category")
+    if categorical.memory_usage(deep=True) < values.memory_usage(deep=True):
+        return categorical
+    return values
+
+
+def _is_unused(df: pd.DataFrame, col) -> bool:
+    # Kolom tanpa header (pd.read_excel menamainya "Unnamed: n") yang seluruhnya kosong
+    return str(col).startswith("Unnamed:") and df[col].isna().all()
+
+
+def compact_dataset(df: pd.DataFrame) -> dict:
+    """Numeric Dashboard view of a template or run (site names in the first column).
+
+    Returns {df, markers, dropped, nbytes_before, nbytes_after}:
+    - df holds the site column and every used category as numbers, with non-numeric values as 0 and
+      integers downcast.
+    - markers is a boolean frame of the cells that held a non-numeric value. It only has the columns
+      that contain any.
+    - nbytes_before is the size of the float64/object view this replaces; nbytes_after covers df and
+      markers.
+    """
+    site_col = df.columns[0]
+    dropped = [col for col in df.columns[1:] if _is_unused(df, col)]
+    categories = [col for col in df.columns[1:] if col not in dropped]
+
+    site_names = df[site_col]
+    nbytes_before = int(site_names.memory_usage(index=True, deep=True)) + 8 * len(df) * len(categories)
+
+    columns = {site_col: _categorize(site_names)}
+    markers = {}
+    for col in categories:
+        values = pd.to_numeric(df[col], errors="coerce")
+        marker = values.isna() & df[col].notna()
+        if marker.any():
+            markers[col] = marker.to_numpy()
+        # Bilangan bulat diperkecil (int8..int64); nilai desimal tetap float64 agar total dan rata-rata sama
+        columns[col] = pd.to_numeric(values.fillna(0), downcast="integer")
+    compact = pd.DataFrame(columns, index=df.index)
+    compact.columns = pd.Index([site_col] + categories, dtype=object)
+    marker_df = pd.DataFrame(markers, index=df.index)
+    return {
+        "df": compact,
+        "markers": marker_df,
+        "dropped": dropped,
+        "nbytes_before": nbytes_before,
+        "nbytes_after": frame_nbytes(compact) + frame_nbytes(marker_df),
+    }
@@ -0,0 +1,47 @@
+"""Plain exports of a result table (CSV, Parquet) for downstream systems that do not need the workbook.
+
+Exports hold values only: the Site Name column and every category as in the result DataFrame. Parquet
+needs pyarrow (optional, as for the run snapshots); without it only CSV is offered.
+"""
+import io
+
+import pandas as pd
+
+from snapshots import PYARROW_AVAILABLE as PARQUET_AVAILABLE
+
+# Format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats() -> list[str]:
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or PARQUET_AVAILABLE]
+
+
+def _parquet_frame(result_df: pd.DataFrame) -> pd.DataFrame:
+    # Parquet butuh nama kolom teks dan satu tipe per kolom; kolom campuran (mis. angka dan 'Y') jadi teks
+    frame = result_df.set_axis([str(col) for col in result_df.columns], axis=1)
+    for col in frame.columns:
+        if frame[col].dtype == object and pd.api.types.infer_dtype(frame[col], skipna=True) not in (
+            "string", "empty", "integer", "floating", "mixed-integer-float", "boolean", "datetime", "date"
+        ):
+            frame[col] = frame[col].map(lambda value: None if pd.isna(value) else str(value))
+    return frame
+
+
+def export_result(result_df: pd.DataFrame, fmt: str, output=None) -> bytes | None:
+    """Write result_df as `fmt` ("csv" or "parquet") to output (path or file); without output the bytes are
+    returned."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "parquet" and not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    target = io.BytesIO() if output is None else output
+    if fmt == "csv":
+        # utf-8-sig: Excel opens the file with the right encoding; other tools ignore the BOM
+        result_df.to_csv(target, index=False, encoding="utf-8-sig")
+    else:
+        _parquet_frame(result_df).to_parquet(target, index=False)
+    return target.getvalue() if output is None else None
@@ -0,0 +1,343 @@
+"""Background execution of the Data Input pipeline.
+
+Jobs run on a bounded, process-wide thread pool, so the Streamlit script thread only submits work and polls
+the jobs table (get_job). Status, stage and progress live in SQLite and the finished workbook is written
+next to the database, so a browser refresh or another session can pick a job up again by its id. Every job
+records the server process that runs it (JOB_OWNER); queued/running jobs of a process that is gone are
+reported as failed, while jobs of other live processes sharing the database are left alone.
+"""
+import io
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from processing import OUTPUT_ENGINES, fill_template
+from profiling import Profiler
+from storage import DB_PATH, create_job, fail_interrupted_jobs, save_result_to_db, save_run_profile, update_job
+from storage import get_job as _load_job
+from upload_cache import ParseCache, count_uploads, parse_sheet_index, parse_site_index, parse_template
+from watermarks import commit_watermarks, count_jobs, source_key
+
+# Jobs processed at the same time (all sessions together); further jobs wait in the queue
+JOB_WORKERS = 2
+# Result workbooks kept on disk; older ones are deleted when a job finishes
+JOB_RESULTS_KEPT = 50
+# Result DataFrames kept in memory for the preview of recently finished jobs
+JOB_FRAMES_IN_MEMORY = 8
+# Stages reported by a job, in order (progress = finished stages / len(JOB_STAGES))
+JOB_STAGES = (
+    "parse_template",
+    "count_sources",
+    "sheet_index",
+    "process_data",
+    "load_workbook",
+    "write_cells",
+    "save_workbook",
+    "save_result_to_db",
+)
+
+# Process that runs the jobs submitted here: host, pid and a boot id (a restarted server may get the same pid)
+JOB_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_recovered_dbs = set()
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+# Jobs of this process that are queued in or running on the executor
+_active_jobs = set()
+_active_jobs_lock = threading.Lock()
+
+
+def results_dir(db_path: Path | None = None) -> Path:
+    db_path = Path(db_path or DB_PATH)
+    return db_path.with_name(f"{db_path.stem}_jobs")
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        import ctypes
+
+        # os.kill would terminate the process on Windows; ask for its exit code instead (259 = STILL_ACTIVE)
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259
+        finally:
+            ctypes.windll.kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_alive(owner: str | None) -> bool:
+    """Whether the server process that owns a job (JOB_OWNER of that process) is still running.
+
+    Jobs without an owner predate owner tracking and count as gone. Processes on another host cannot be
+    checked and count as alive.
+    """
+    if owner == JOB_OWNER:
+        return True
+    if not owner:
+        return False
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname():
+        return True
+    if int(pid) == os.getpid():
+        # Pid yang sama dengan boot id lain: proses server sebelumnya
+        return False
+    return _pid_alive(int(pid))
+
+
+def fail_orphaned_jobs(db_path: Path | None = None, job_id: str | None = None) -> int:
+    """Mark queued/running jobs (or only job_id) whose server process is gone as failed. Returns how many."""
+    interrupted = fail_interrupted_jobs(owner_alive, db_path=db_path, job_id=job_id)
+    if interrupted:
+        logger.warning("Marked %d interrupted job(s) as failed", interrupted)
+    return interrupted
+
+
+def _recover_jobs(db_path: Path | None = None):
+    # Sekali per database dan proses: job yatim dari proses server sebelumnya dilaporkan gagal
+    key = str(Path(db_path or DB_PATH).resolve())
+    with _executor_lock:
+        if key in _recovered_dbs:
+            return
+        _recovered_dbs.add(key)
+    fail_orphaned_jobs(db_path)
+
+
+def _get_executor(db_path: Path | None = None) -> ThreadPoolExecutor:
+    global _executor
+    _recover_jobs(db_path)
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="master-sheet-job")
+        return _executor
+
+
+def get_job(job_id: str, db_path: Path | None = None) -> dict | None:
+    """One job (see storage.get_job); a queued/running job whose server process is gone is reported as failed."""
+    _recover_jobs(db_path)
+    job = _load_job(job_id, db_path)
+    if job is None or job["status"] not in ("queued", "running"):
+        return job
+    if job["owner"] == JOB_OWNER:
+        # Job proses ini yang tidak lagi ada di executor gagal menulis status akhirnya
+        with _active_jobs_lock:
+            orphaned = job_id not in _active_jobs
+        if orphaned:
+            fail_interrupted_jobs(lambda owner: False, db_path=db_path, job_id=job_id)
+            job = _load_job(job_id, db_path)
+    elif not owner_alive(job["owner"]):
+        fail_orphaned_jobs(db_path, job_id=job_id)
+        job = _load_job(job_id, db_path)
+    return job
+
+
+class _JobProfiler(Profiler):
+    """Profiler that also publishes the current stage and progress of its job.
+
+    Progress is best effort: while a save holds the database lock the update is skipped instead of
+    failing the job.
+    """
+
+    def __init__(self, job_id: str, db_path: Path | None, trace_memory: bool = False):
+        super().__init__("data_input", trace_memory=trace_memory)
+        self.job_id = job_id
+        self.db_path = db_path
+
+    def _publish(self, **fields):
+        try:
+            update_job(self.job_id, self.db_path, retry_seconds=0, **fields)
+        except sqlite3.OperationalError as exc:
+            logger.warning("Job %s: progress not recorded (%s)", self.job_id, exc)
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        self._publish(stage=stage)
+        with super().span(stage, **attrs) as entry:
+            yield entry
+        progress = {"stages_done": len(self.spans)}
+        if "rows" in entry:
+            progress["rows"] = entry["rows"]
+        self._publish(**progress)
+
+
+def _remember_frame(job_id: str, result_df):
+    with _frames_lock:
+        _frames[job_id] = result_df
+        while len(_frames) > JOB_FRAMES_IN_MEMORY:
+            _frames.popitem(last=False)
+
+
+def get_result_frame(job_id: str):
+    """result_df of a recently finished job in this process, or None (e.g. after a restart)."""
+    with _frames_lock:
+        return _frames.get(job_id)
+
+
+def result_available(job: dict) -> bool:
+    path = job.get("result_path")
+    return bool(path) and Path(path).exists()
+
+
+def read_result(job: dict) -> bytes | None:
+    """Workbook bytes of a finished job, or None when the file is gone."""
+    if not result_available(job):
+        return None
+    return Path(job["result_path"]).read_bytes()
+
+
+def _prune_results(directory: Path):
+    files = sorted(directory.glob("*.xls*"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in files[JOB_RESULTS_KEPT:]:
+        path.unlink(missing_ok=True)
+
+
+def _run_job(
+    job_id,
+    db_path,
+    result_name,
+    template_bytes,
+    sources,
+    source_names,
+    aggregations,
+    max_workers,
+    trace_memory,
+    parse_cache,
+    engine,
+):
+    profiler = _JobProfiler(job_id, db_path, trace_memory=trace_memory)
+    try:
+        update_job(job_id, db_path, status="running")
+        with profiler.span("parse_template"):
+            _, template_df = parse_template(parse_cache, template_bytes)
+            site_index = parse_site_index(parse_cache, template_bytes)
+        source_files = [io.BytesIO(data) for data, _, _ in sources]
+        with profiler.span("count_sources", files=len(sources), workers=max_workers) as entry:
+            # Job Incremental hanya menghitung baris baru setelah watermark-nya
+            site_counts, pending_watermarks = count_jobs(
+                source_files,
+                [(source_file, target, mode) for source_file, (_, target, mode) in zip(source_files, sources)],
+                [source_key(name) for name in source_names],
+                aggregations,
+                lambda files, file_aggregations: count_uploads(
+                    parse_cache, files, max_workers=max_workers, aggregations=file_aggregations
+                ),
+                db_path=db_path,
+            )
+            entry["rows"] = int(sum(counts.sum() for counts in site_counts))
+        with profiler.span("sheet_index"):
+            sheet_index = parse_sheet_index(parse_cache, template_bytes)
+        directory = results_dir(db_path)
+        directory.mkdir(parents=True, exist_ok=True)
+        result_path = directory / f"{job_id}{Path(result_name).suffix}"
+        # Tulis hasil (sekali untuk semua job) langsung ke file hasil, tanpa salinan bytes di memori
+        result_df, header, _ = fill_template(
+            io.BytesIO(template_bytes),
+            [(source_file, target, mode) for source_file, (_, target, mode) in zip(source_files, sources)],
+            template_df=template_df,
+            site_counts=site_counts,
+            sheet_index=sheet_index,
+            site_index=site_index,
+            profiler=profiler,
+            engine=engine,
+            output=result_path,
+        )
+        _remember_frame(job_id, result_df)
+        _prune_results(directory)
+
+        # Save to SQLite database for Dashboard auto-use; a failure here still leaves the workbook available
+        result = {"rows": len(result_df)}
+        if pending_watermarks:
+            result["incremental"] = commit_watermarks(pending_watermarks, db_path=db_path)
+        try:
+            with profiler.span("save_result_to_db"):
+                run_meta = save_result_to_db(result_df, header, db_path=db_path)
+            if run_meta:
+                save_run_profile(run_meta["run_id"], profiler.to_dict(), db_path=db_path)
+                result["run"] = run_meta
+        except Exception as db_err:
+            logger.exception("Job %s: failed to save to database", job_id)
+            result["db_error"] = str(db_err)
+        profiler.log()
+        update_job(
+            job_id,
+            db_path,
+            status="done",
+            stage=None,
+            stages_done=len(JOB_STAGES),
+            result_path=str(result_path),
+            run_id=result.get("run", {}).get("run_id"),
+            result_json=result,
+            profile_json=profiler.to_dict(),
+        )
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        try:
+            update_job(job_id, db_path, status="failed", error=str(e), profile_json=profiler.to_dict())
+        except Exception:
+            # get_job melaporkan job ini gagal setelah keluar dari _active_jobs
+            logger.exception("Job %s: could not record the failure", job_id)
+    finally:
+        with _active_jobs_lock:
+            _active_jobs.discard(job_id)
+
+
+def submit_job(
+    result_name: str,
+    template_bytes: bytes,
+    sources,
+    max_workers: int = 1,
+    trace_memory: bool = False,
+    parse_cache: ParseCache | None = None,
+    db_path: Path | None = None,
+    aggregations=None,
+    source_names=None,
+    engine: str = OUTPUT_ENGINES[0],
+) -> str:
+    """Queue a processing job and return its id.
+
+    sources: list of (source bytes, target column, mode). result_name is the download file name; its
+    extension (.xlsx/.xlsm) is kept for the stored workbook. aggregations: optional (aggregation,
+    value_column) per source (see processing.count_sources); rows are counted by default. source_names
+    (e.g. the uploaded file names) identify the sources of Incremental jobs; see watermarks.py. engine is
+    the workbook writer (processing.OUTPUT_ENGINES).
+    """
+    sources = list(sources)
+    job_id = uuid.uuid4().hex
+    executor = _get_executor(db_path)
+    create_job(job_id, result_name, db_path=db_path, owner=JOB_OWNER)
+    with _active_jobs_lock:
+        _active_jobs.add(job_id)
+    executor.submit(
+        _run_job,
+        job_id,
+        db_path,
+        result_name,
+        template_bytes,
+        sources,
+        list(source_names) if source_names is not None else [f"source_{i + 1}" for i in range(len(sources))],
+        list(aggregations) if aggregations is not None else None,
+        max_workers,
+        trace_memory,
+        parse_cache if parse_cache is not None else ParseCache(),
+        engine,
+    )
+    return job_id
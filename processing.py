@@ -0,0 +1,623 @@
+"""Counting, template update and workbook write-back logic used by the Master Sheet Assistant."""
+import hashlib
+import io
+import itertools
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+from profiling import span
+from sheet_layout import SHEET_FIRST_DATA_ROW, SOURCE_COLUMNS, SOURCE_HEADER_ROW
+from site_index import SiteIndex
+
+UPDATE_MODES = ["Add (Tambah)", "Replace (Ganti)", "Incremental (Baris baru)"]
+
+
+# Cara menghitung nilai per site dari file sumber (dipilih bersama mode Add/Replace)
+AGGREGATIONS = [
+    "Count rows (Hitung baris)",
+    "Distinct students (Siswa unik)",
+    "Distinct student-course pairs (Pasangan unik)",
+    "Sum of column (Jumlah kolom)",
+]
+# Kolom yang menentukan baris duplikat untuk mode distinct (selain Site Name)
+_DISTINCT_COLUMNS = {
+    AGGREGATIONS[1]: ("Student Code",),
+    AGGREGATIONS[2]: ("Student Code", "Course Code"),
+}
+
+
+def _check_aggregation(aggregation, value_column):
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation: {aggregation}")
+    if aggregation == AGGREGATIONS[3] and not value_column:
+        raise ValueError("Sum of column needs a value column")
+
+
+# Fungsi untuk memproses data
+def count_sites(source_df, aggregation=AGGREGATIONS[0], value_column=None):
+    """
+    Hitung nilai per 'Site Name' dari baris di mana 'Student Code' dan 'Course Code' tidak kosong:
+    jumlah baris, jumlah siswa unik, jumlah pasangan siswa-kursus unik, atau jumlah value_column
+    (nilai non-numerik dianggap 0). Urutan: nilai terbesar dulu, seri mengikuti kemunculan pertama.
+    """
+    _check_aggregation(aggregation, value_column)
+    filtered_df = source_df.dropna(subset=['Student Code', 'Course Code'])
+    if aggregation == AGGREGATIONS[3]:
+        values = pd.to_numeric(filtered_df[value_column], errors='coerce')
+        sums = values.groupby(filtered_df['Site Name'], sort=False).sum()
+        sums.name = "count"
+        return sums.sort_values(ascending=False, kind="stable")
+    if aggregation in _DISTINCT_COLUMNS:
+        # drop_duplicates memakai hash per baris, jadi tetap linear untuk jutaan baris
+        filtered_df = filtered_df.drop_duplicates(subset=['Site Name', *_DISTINCT_COLUMNS[aggregation]])
+    return filtered_df['Site Name'].value_counts()
+
+
+# Nilai sel yang dianggap kosong oleh pd.read_excel (default na_values + kode error Excel)
+_MISSING_CELL_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+    "#DIV/0!", "#NAME?", "#NULL!", "#NUM!", "#REF!", "#VALUE!",
+})
+
+
+def _is_missing_cell(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value in _MISSING_CELL_STRINGS
+    return isinstance(value, float) and value != value
+
+
+def _cell_key(value):
+    # pd.read_excel membaca angka bulat sebagai int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _numeric_cell(value):
+    # Sama dengan pd.to_numeric(errors='coerce') lalu sum(): sel kosong/non-numerik bernilai 0
+    if isinstance(value, (int, float)):
+        return 0.0 if value != value else float(value)
+    if isinstance(value, str) and not _is_missing_cell(value):
+        try:
+            return float(value)
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+def _source_header(rows):
+    header_row = next(rows, None) or ()
+    return [str(h).strip() if h is not None else "" for h in header_row]
+
+
+def read_source_columns(source_file):
+    """Nama kolom (header baris SOURCE_HEADER_ROW) dari sheet pertama file sumber."""
+    if hasattr(source_file, "seek"):
+        source_file.seek(0)
+    wb = openpyxl.load_workbook(source_file, read_only=True, data_only=True)
+    try:
+        return [name for name in _source_header(wb.worksheets[0].iter_rows(min_row=SOURCE_HEADER_ROW, values_only=True)) if name]
+    finally:
+        wb.close()
+
+
+def iter_source_rows(source_file, value_column=None):
+    """
+    Baca file sumber secara streaming (openpyxl read_only) dan hasilkan tuple
+    (Student Code, Course Code, Site Name) per baris data, tanpa memuat kolom lain.
+    Dengan value_column, nilai kolom tersebut ditambahkan sebagai elemen ke-4.
+    """
+    columns = SOURCE_COLUMNS + ((value_column,) if value_column else ())
+    if hasattr(source_file, "seek"):
+        source_file.seek(0)
+    wb = openpyxl.load_workbook(source_file, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(min_row=SOURCE_HEADER_ROW, values_only=True)
+        header = _source_header(rows)
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"Source file is missing required column(s): {', '.join(missing)}")
+        positions = [header.index(c) for c in columns]
+        width = max(positions) + 1
+        for row in rows:
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            yield tuple(row[i] for i in positions)
+    finally:
+        wb.close()
+
+
+def count_sites_from_rows(rows, aggregation=AGGREGATIONS[0]):
+    """
+    Hitung nilai per Site Name secara inkremental dari iterable tuple (student, course, site[, value]).
+    Hasilnya sama dengan count_sites() pada DataFrame yang sama, termasuk urutannya; mode distinct
+    menyimpan set hash dari kunci yang sudah terlihat, mode sum membutuhkan elemen value.
+    """
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation: {aggregation}")
+    distinct = aggregation in _DISTINCT_COLUMNS
+    pairs = aggregation == AGGREGATIONS[2]
+    summing = aggregation == AGGREGATIONS[3]
+    counts = {}
+    seen = set()
+    for row in rows:
+        student, course, site = row[:3]
+        if _is_missing_cell(student) or _is_missing_cell(course) or _is_missing_cell(site):
+            continue
+        site = _cell_key(site)
+        if distinct:
+            key = (site, _cell_key(student), _cell_key(course)) if pairs else (site, _cell_key(student))
+            if key in seen:
+                continue
+            seen.add(key)
+        counts[site] = counts.get(site, 0) + (_numeric_cell(row[3]) if summing else 1)
+    site_counts = pd.Series(
+        list(counts.values()),
+        index=pd.Index(list(counts.keys()), name="Site Name"),
+        name="count",
+        dtype="float64" if summing else "int64",
+    )
+    return site_counts.sort_values(ascending=False, kind="stable")
+
+
+def _hash_row(digest, row):
+    digest.update(repr(row).encode("utf-8", "backslashreplace"))
+    digest.update(b"\n")
+
+
+def count_sites_after_prefix(source_file, prefix_rows=0, prefix_hash=None, aggregation=AGGREGATIONS[0], value_column=None):
+    """
+    Hitung hanya baris data setelah `prefix_rows` baris pertama, asalkan hash baris-baris prefix itu
+    sama dengan prefix_hash; jika berbeda (atau file lebih pendek) seluruh file dihitung ulang.
+    Hash dihitung dari kolom yang dibaca (SOURCE_COLUMNS dan value_column), per baris.
+    Mengembalikan (site_counts, rows, rows_hash, prefix_matched); rows dan rows_hash mencakup seluruh
+    file sehingga bisa disimpan sebagai watermark berikutnya.
+    """
+    _check_aggregation(aggregation, value_column)
+    value_column = value_column if aggregation == AGGREGATIONS[3] else None
+    digest = hashlib.blake2b(digest_size=16)
+    rows = iter_source_rows(source_file, value_column=value_column)
+    read = 0
+    if prefix_rows:
+        # Baris prefix tetap harus diparse (xlsx tidak bisa dilompati), tetapi tidak dihitung
+        for row in itertools.islice(rows, prefix_rows):
+            _hash_row(digest, row)
+            read += 1
+        if read < prefix_rows or digest.hexdigest() != prefix_hash:
+            rows.close()
+            site_counts, read, rows_hash, _ = count_sites_after_prefix(source_file, 0, None, aggregation, value_column)
+            return site_counts, read, rows_hash, False
+
+    def hashed_rows():
+        nonlocal read
+        for row in rows:
+            _hash_row(digest, row)
+            read += 1
+            yield row
+
+    site_counts = count_sites_from_rows(hashed_rows(), aggregation)
+    return site_counts, read, digest.hexdigest(), True
+
+
+def count_sites_from_excel(source_file, aggregation=AGGREGATIONS[0], value_column=None):
+    """
+    Versi streaming dari count_sites(pd.read_excel(source_file, header=1), aggregation, value_column).
+    Pemakaian memori tetap datar berapa pun ukuran file sumber (mode distinct: sebanding dengan
+    jumlah kunci unik).
+    """
+    _check_aggregation(aggregation, value_column)
+    value_column = value_column if aggregation == AGGREGATIONS[3] else None
+    return count_sites_from_rows(iter_source_rows(source_file, value_column=value_column), aggregation)
+
+
+def apply_site_counts(template_df, site_counts, target_column, mode, site_index=None):
+    """
+    Terapkan hasil hitungan per site ke salinan template_df dalam satu operasi kolom.
+    Site dicocokkan lewat SiteIndex (nama yang dinormalisasi; baris pertama yang cocok dipakai),
+    site_index bisa diberikan jika sudah dibuat untuk kolom pertama template_df.
+    Site yang belum ada di template ditambahkan sekaligus di akhir, sesuai urutan site_counts.
+    """
+    # Buat salinan template_df agar tidak mengubah data asli secara langsung
+    updated_df = template_df.copy()
+    # Asumsikan kolom A (kolom pertama) di template adalah untuk 'Site Name'
+    site_name_col_in_template = updated_df.columns[0]
+    if len(site_counts) == 0:
+        return updated_df
+
+    # Petakan setiap Site Name ke baris pertama yang cocok di template
+    if site_index is None:
+        site_index = SiteIndex(updated_df[site_name_col_in_template])
+    site_counts = site_index.canonical_counts(site_counts)
+    positions = site_index.positions_of(site_counts.index)
+    found = positions >= 0
+    counts = site_counts.to_numpy()
+
+    row_idx = updated_df.index[positions[found]]
+    if len(row_idx):
+        # Kolom teks (mis. berisi 'Y') harus bisa menampung angka hasil hitungan
+        if target_column in updated_df.columns and not pd.api.types.is_numeric_dtype(updated_df[target_column]):
+            updated_df[target_column] = updated_df[target_column].astype(object)
+        # Kolom bilangan bulat harus bisa menampung hasil Sum of column yang berupa desimal
+        elif pd.api.types.is_integer_dtype(updated_df[target_column]) and not pd.api.types.is_integer_dtype(counts):
+            updated_df[target_column] = updated_df[target_column].astype(float)
+        if mode == "Add (Tambah)":
+            # Ubah nilai saat ini ke numerik, anggap 0 jika kosong/error
+            current_values = pd.to_numeric(updated_df.loc[row_idx, target_column], errors='coerce').fillna(0)
+            updated_df.loc[row_idx, target_column] = current_values.to_numpy() + counts[found]
+        else:  # Mode "Replace (Ganti)"; Incremental juga mengganti nilai dengan total kumulatif (lihat watermarks.py)
+            updated_df.loc[row_idx, target_column] = counts[found]
+
+    # Site Name yang tidak ditemukan ditambahkan sebagai baris baru dalam satu batch
+    if not found.all():
+        new_rows = pd.DataFrame({
+            site_name_col_in_template: site_counts.index[~found],
+            target_column: counts[~found],
+        })
+        updated_df = pd.concat([updated_df, new_rows], ignore_index=True)
+    return updated_df
+
+
+def _count_source(source, aggregation=AGGREGATIONS[0], value_column=None):
+    """Worker proses: parse satu workbook sumber (path atau bytes) menjadi Series Site Name -> jumlah."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return count_sites_from_excel(source, aggregation, value_column)
+
+
+def _as_worker_source(source_file):
+    # File upload (BytesIO/UploadedFile) dikirim sebagai bytes agar bisa di-pickle ke proses worker
+    if hasattr(source_file, "getvalue"):
+        return source_file.getvalue()
+    if hasattr(source_file, "read"):
+        source_file.seek(0)
+        return source_file.read()
+    return str(source_file)
+
+
+def count_sources(source_files, max_workers=1, aggregations=None):
+    """
+    Hitung Site Name untuk beberapa workbook sumber.
+    aggregations (opsional) berisi (aggregation, value_column) per file; default Count rows untuk semua.
+    Dengan max_workers > 1 setiap workbook diparse di proses worker terpisah; urutan hasil
+    selalu sama dengan urutan source_files sehingga hasilnya identik dengan eksekusi serial.
+    """
+    source_files = list(source_files)
+    if aggregations is None:
+        aggregations = [(AGGREGATIONS[0], None)] * len(source_files)
+    aggregations = list(aggregations)
+    if max_workers is None or max_workers <= 1 or len(source_files) <= 1:
+        return [
+            count_sites_from_excel(source_file, aggregation, value_column)
+            for source_file, (aggregation, value_column) in zip(source_files, aggregations)
+        ]
+    sources = [_as_worker_source(source_file) for source_file in source_files]
+    workers = min(max_workers, len(sources))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(
+            _count_source,
+            sources,
+            [aggregation for aggregation, _ in aggregations],
+            [value_column for _, value_column in aggregations],
+        ))
+
+
+def merge_site_counts(partial_counts):
+    """
+    Gabungkan beberapa Series hitungan. Urutan site mengikuti kemunculan pertama, sehingga
+    menerapkan hasil gabungan dengan mode Add sama dengan menerapkan setiap bagian berurutan.
+    """
+    partial_counts = [counts for counts in partial_counts if len(counts)]
+    if not partial_counts:
+        return pd.Series([], index=pd.Index([], name="Site Name"), name="count", dtype="int64")
+    if len(partial_counts) == 1:
+        return partial_counts[0]
+    merged = pd.concat(partial_counts).groupby(level=0, sort=False).sum()
+    merged.index.name = "Site Name"
+    merged.name = "count"
+    return merged
+
+
+def process_batch(template_df, jobs, max_workers=1, site_counts=None, site_index=None, aggregations=None):
+    """
+    Jalankan beberapa job (source_file, target_column, mode) secara berurutan pada satu template di memori.
+    File sumber dihitung (paralel jika max_workers > 1); job Add berurutan untuk kolom yang sama
+    digabung dulu dengan merge_site_counts sebelum diterapkan. Total kumulatif semua job Incremental
+    untuk kolom yang sama dijumlahkan dan diterapkan sekali, pada posisi job Incremental pertama.
+    site_counts (opsional) berisi hitungan yang sudah ada per job, misalnya dari cache upload;
+    site_index (opsional) adalah SiteIndex kolom pertama template_df; aggregations (opsional) berisi
+    (aggregation, value_column) per job, lihat count_sources.
+    Mengembalikan (result_df, updated_sites) di mana updated_sites memetakan kolom target ke Site Name
+    yang diperbarui, siap untuk write_result_to_sheet.
+    """
+    jobs = list(jobs)
+    if site_counts is None:
+        all_counts = count_sources(
+            [source_file for source_file, _, _ in jobs], max_workers=max_workers, aggregations=aggregations
+        )
+    else:
+        all_counts = list(site_counts)
+
+    # Kelompokkan job Add berurutan dengan kolom target yang sama. Job Incremental menulis total kumulatif
+    # (Replace), jadi semua sumber Incremental untuk satu kolom dijumlahkan dulu lalu diterapkan sekali
+    steps = []
+    incremental_steps = {}
+    for (_, target_column, mode), job_counts in zip(jobs, all_counts):
+        if mode == UPDATE_MODES[2] and target_column in incremental_steps:
+            incremental_steps[target_column][0].append(job_counts)
+        elif steps and mode == "Add (Tambah)" and steps[-1][1:] == (target_column, mode):
+            steps[-1][0].append(job_counts)
+        else:
+            steps.append(([job_counts], target_column, mode))
+            if mode == UPDATE_MODES[2]:
+                incremental_steps[target_column] = steps[-1]
+
+    result_df = template_df
+    site_name_col = template_df.columns[0]
+    if site_index is None:
+        site_index = SiteIndex(template_df[site_name_col])
+    updated_sites = {}
+    for partial_counts, target_column, mode in steps:
+        # Nama site mengikuti penulisan di template, sehingga updated_sites cocok dengan result_df
+        merged_counts = site_index.canonical_counts(merge_site_counts(partial_counts))
+        rows_before = len(result_df)
+        result_df = apply_site_counts(result_df, merged_counts, target_column, mode, site_index=site_index)
+        if len(result_df) > rows_before:
+            site_index = site_index.append(result_df[site_name_col].iloc[rows_before:])
+        updated_sites.setdefault(target_column, {}).update(dict.fromkeys(merged_counts.index))
+    if result_df is template_df:
+        result_df = template_df.copy()
+    return result_df, {col: list(sites) for col, sites in updated_sites.items()}
+
+
+def process_data(source_df, template_df, target_column, mode):
+    """
+    Fungsi ini mengambil data sumber, menghitungnya, dan memperbarui DataFrame template.
+    """
+    return apply_site_counts(template_df, count_sites(source_df), target_column, mode)
+
+
+def build_sheet_index(ws):
+    """
+    SiteIndex dari Site Name (kolom A) sheet dalam satu kali iterasi; posisi + SHEET_FIRST_DATA_ROW
+    adalah nomor baris sheet.
+    """
+    return SiteIndex(val for (val,) in ws.iter_rows(min_row=SHEET_FIRST_DATA_ROW, max_col=1, values_only=True))
+
+
+def _cell_value(value):
+    return None if pd.isna(value) else value
+
+
+def _sheet_columns(header, columns):
+    # Kolom DataFrame -> nomor kolom sheet (berdasarkan nama header, atau posisi untuk header kosong/duplikat)
+    column_to_sheet_col = {}
+    for pos, col_name in enumerate(columns):
+        if col_name in header:
+            column_to_sheet_col[col_name] = header.index(col_name) + 1
+        elif pos < len(header):
+            column_to_sheet_col[col_name] = pos + 1
+    return column_to_sheet_col
+
+
+def _sheet_updates(result_df, updated_sites, sheet_index, column_to_sheet_col):
+    """
+    Sel yang harus ditulis ke sheet: ({nomor baris: {nomor kolom: nilai}} untuk site yang sudah ada,
+    [(Site Name, {nomor kolom: nilai})] untuk site baru sesuai urutan di result_df).
+    """
+    site_name_col = result_df.columns[0]
+    first_rows = result_df.drop_duplicates(subset=[site_name_col], keep="first").set_index(site_name_col)
+
+    row_updates = {}
+    new_sites = {}
+    for target_column, sites in updated_sites.items():
+        sheet_col = column_to_sheet_col.get(target_column)
+        values = first_rows[target_column].reindex(sites)
+        positions = sheet_index.positions_of(values.index)
+        for (site_name, value), pos in zip(values.items(), positions):
+            if pos < 0:
+                new_sites[site_name] = None
+                continue
+            if sheet_col is None:
+                continue
+            row_updates.setdefault(int(pos) + SHEET_FIRST_DATA_ROW, {})[sheet_col] = _cell_value(value)
+
+    new_rows = []
+    for site_name in (site for site in first_rows.index if site in new_sites):
+        row_data = first_rows.loc[site_name]
+        cells = {1: site_name}
+        for col_name, sheet_col in column_to_sheet_col.items():
+            if col_name == site_name_col:
+                continue
+            value = _cell_value(row_data[col_name])
+            if value is not None:
+                cells[sheet_col] = value
+        new_rows.append((site_name, cells))
+    return row_updates, new_rows
+
+
+def write_result_to_sheet(ws, result_df, updated_sites, sheet_index=None):
+    """
+    Tulis hasil ke worksheet template hanya pada sel yang berubah.
+
+    updated_sites memetakan kolom target ke Site Name yang hitungannya diterapkan.
+    Untuk site yang sudah ada (baris pertama dengan nama ternormalisasi yang sama), hanya sel kolom
+    target yang ditulis (dan hanya jika nilainya berbeda); site baru ditambahkan sekaligus di akhir
+    sheet dengan semua kolom header.
+    sheet_index (opsional) adalah hasil build_sheet_index untuk workbook yang sama.
+    Mengembalikan jumlah sel yang ditulis.
+    """
+    header = [cell.value for cell in ws[1]]
+    if sheet_index is None:
+        sheet_index = build_sheet_index(ws)
+    row_updates, new_rows = _sheet_updates(result_df, updated_sites, sheet_index, _sheet_columns(header, result_df.columns))
+
+    cells_written = 0
+    for row_idx, cells in row_updates.items():
+        for sheet_col, value in cells.items():
+            cell = ws.cell(row=row_idx, column=sheet_col)
+            if cell.value != value:
+                cell.value = value
+                cells_written += 1
+
+    # Site baru: tulis sesuai urutan di result_df, langsung setelah baris terakhir
+    next_row = ws.max_row + 1
+    for _, cells in new_rows:
+        for sheet_col, value in cells.items():
+            ws.cell(row=next_row, column=sheet_col, value=value)
+            cells_written += 1
+        next_row += 1
+    return cells_written
+
+
+# Mesin penulis workbook hasil: "openpyxl" menjaga format/makro template, "streaming" menulis nilai dan rumus
+# tanpa format (openpyxl write_only, memori datar) dan hanya untuk template .xlsx tanpa makro
+OUTPUT_ENGINES = ("openpyxl", "streaming")
+
+
+def _has_macros(template_file):
+    if hasattr(template_file, "seek"):
+        template_file.seek(0)
+    try:
+        with zipfile.ZipFile(template_file) as archive:
+            return any(name.lower().endswith("vbaproject.bin") for name in archive.namelist())
+    finally:
+        if hasattr(template_file, "seek"):
+            template_file.seek(0)
+
+
+def _is_macro_name(file) -> bool:
+    # Nama .xlsm (path, atau atribut name dari file upload) harus tetap berisi workbook dengan makro
+    name = file if isinstance(file, (str, os.PathLike)) else getattr(file, "name", None)
+    return isinstance(name, (str, os.PathLike)) and Path(name).suffix.lower() == ".xlsm"
+
+
+def write_streaming_workbook(template_file, result_df, updated_sites, output, sheet_name="Master Sheet", sheet_index=None, profiler=None):
+    """
+    Tulis workbook hasil dengan openpyxl write_only, baris demi baris: setiap sheet disalin dari template
+    (nilai dan rumus, tanpa format). Di sheet_name hanya sel yang juga ditulis write_result_to_sheet yang
+    berubah: sel kolom target site yang sudah ada, dan site baru yang ditambahkan setelah baris terakhir.
+    Template dibaca read-only sehingga pemakaian memori tidak bergantung pada ukuran workbook.
+    sheet_index (opsional) adalah hasil build_sheet_index untuk sheet_name template yang sama.
+    output adalah path atau file. Mengembalikan (header, jumlah sel yang ditulis).
+    Template atau output .xlsm ditolak (juga tanpa makro): hasilnya workbook .xlsx biasa yang tidak dibuka
+    Excel dengan nama .xlsm.
+    """
+    if _is_macro_name(template_file) or _is_macro_name(output) or _has_macros(template_file):
+        raise ValueError("The streaming output engine cannot keep macros; use the openpyxl engine for .xlsm templates.")
+    if hasattr(template_file, "seek"):
+        template_file.seek(0)
+    with span(profiler, "load_workbook"):
+        source_wb = openpyxl.load_workbook(template_file, read_only=True)
+    if sheet_name not in source_wb.sheetnames:
+        source_wb.close()
+        raise KeyError(f"Worksheet {sheet_name} does not exist.")
+    output_wb = openpyxl.Workbook(write_only=True)
+    header = None
+    cells_written = 0
+    try:
+        with span(profiler, "write_cells") as entry:
+            for source_ws in source_wb.worksheets:
+                target_ws = output_wb.create_sheet(source_ws.title)
+                if source_ws.title != sheet_name:
+                    for row in source_ws.iter_rows(values_only=True):
+                        target_ws.append(row)
+                    continue
+                header = list(next(source_ws.iter_rows(min_row=1, max_row=1, values_only=True), ()))
+                if sheet_index is None:
+                    sheet_index = build_sheet_index(source_ws)
+                row_updates, new_rows = _sheet_updates(
+                    result_df, updated_sites, sheet_index, _sheet_columns(header, result_df.columns)
+                )
+                for row_idx, row in enumerate(source_ws.iter_rows(min_row=1, values_only=True), start=1):
+                    cells = row_updates.get(row_idx)
+                    if cells:
+                        row = list(row) + [None] * (max(cells) - len(row))
+                        for sheet_col, value in cells.items():
+                            if row[sheet_col - 1] != value:
+                                row[sheet_col - 1] = value
+                                cells_written += 1
+                    target_ws.append(row)
+                # Site baru: sesuai urutan di result_df, langsung setelah baris terakhir
+                for _, cells in new_rows:
+                    row = [None] * max(cells)
+                    for sheet_col, value in cells.items():
+                        row[sheet_col - 1] = value
+                    target_ws.append(row)
+                    cells_written += len(cells)
+            entry["cells"] = cells_written
+    finally:
+        source_wb.close()
+    with span(profiler, "save_workbook"):
+        output_wb.save(output)
+    return header, cells_written
+
+
+def fill_template(
+    template_file,
+    jobs,
+    template_df=None,
+    max_workers=1,
+    sheet_name="Master Sheet",
+    site_counts=None,
+    sheet_index=None,
+    site_index=None,
+    aggregations=None,
+    profiler=None,
+    engine=OUTPUT_ENGINES[0],
+    output=None,
+):
+    """
+    Pipeline lengkap tanpa UI: hitung semua job, perbarui template, dan tulis ke workbook asli
+    (format dan makro tetap terjaga dengan keep_vba=True).
+    site_counts, sheet_index dan site_index (opsional) memakai hasil parse yang sudah ada alih-alih
+    menghitung ulang. aggregations (opsional) berisi (aggregation, value_column) per job.
+    profiler (opsional, profiling.Profiler) mencatat durasi setiap tahap.
+    engine memilih penulis workbook (lihat OUTPUT_ENGINES). Dengan output (path atau file) workbook
+    langsung disimpan ke sana dan output_bytes bernilai None.
+    Mengembalikan (result_df, header, output_bytes).
+    """
+    if engine not in OUTPUT_ENGINES:
+        raise ValueError(f"Unknown output engine: {engine}")
+    jobs = list(jobs)
+    if template_df is None:
+        if hasattr(template_file, "seek"):
+            template_file.seek(0)
+        with span(profiler, "read_template"):
+            template_df = pd.read_excel(template_file, sheet_name=sheet_name)
+    if site_counts is None:
+        with span(profiler, "count_sources", files=len(jobs), workers=max_workers):
+            site_counts = count_sources(
+                [source_file for source_file, _, _ in jobs], max_workers=max_workers, aggregations=aggregations
+            )
+    with span(profiler, "process_data", jobs=len(jobs)) as entry:
+        result_df, updated_sites = process_batch(template_df, jobs, site_counts=site_counts, site_index=site_index)
+        entry["rows"] = len(result_df)
+
+    target = io.BytesIO() if output is None else output
+    if engine == "streaming":
+        header, _ = write_streaming_workbook(
+            template_file, result_df, updated_sites, target, sheet_name=sheet_name, sheet_index=sheet_index, profiler=profiler
+        )
+    else:
+        if hasattr(template_file, "seek"):
+            template_file.seek(0)
+        with span(profiler, "load_workbook"):
+            wb = openpyxl.load_workbook(template_file, keep_vba=True)
+        ws = wb[sheet_name]
+        header = [cell.value for cell in ws[1]]
+        with span(profiler, "write_cells") as entry:
+            entry["cells"] = write_result_to_sheet(ws, result_df, updated_sites, sheet_index=sheet_index)
+
+        with span(profiler, "save_workbook"):
+            wb.save(target)
+    return result_df, header, target.getvalue() if output is None else None
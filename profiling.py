@@ -0,0 +1,82 @@
+"""Lightweight stage timing for the processing pipeline and Dashboard loads.
+
+A Profiler collects flat, sequential spans (stage name, seconds, optional peak memory). The result is a
+plain dict that is shown in the app's "Performance" expander, exported as JSON, logged as one structured
+line and stored per run (runs.profile_json).
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc is process-wide: spans with memory tracing (e.g. of background jobs in other threads) take turns
+_trace_lock = threading.RLock()
+
+
+class Profiler:
+    """Records one span per pipeline stage. With trace_memory, each span also reports the peak of Python
+    allocations (tracemalloc) while it ran; this slows the pipeline down, so it is off by default.
+
+    Traced spans of all profilers in the process run one at a time, so one span never restarts or stops
+    another's trace. The peak still includes allocations of untraced threads running at the same time."""
+
+    def __init__(self, name: str, trace_memory: bool = False):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.started_at = datetime.utcnow().isoformat()
+        self.spans = []
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        if self.trace_memory:
+            # Tunggu span lain yang sedang melacak memori (thread lain) selesai
+            _trace_lock.acquire()
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        entry = {"stage": stage, **attrs}
+        try:
+            yield entry
+        finally:
+            entry["seconds"] = round(time.perf_counter() - started, 6)
+            if self.trace_memory:
+                entry["peak_mib"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+                if tracing:
+                    tracemalloc.stop()
+                _trace_lock.release()
+            self.spans.append(entry)
+
+    @property
+    def total_seconds(self) -> float:
+        return round(sum(entry["seconds"] for entry in self.spans), 6)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "total_seconds": self.total_seconds,
+            "trace_memory": self.trace_memory,
+            "spans": list(self.spans),
+        }
+
+    def to_json(self, indent: int | None = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent, default=str)
+
+    def log(self, level: int = logging.INFO):
+        """Emit the whole profile as one JSON log line."""
+        logger.log(level, "profile %s", self.to_json())
+
+
+def span(profiler: Profiler | None, stage: str, **attrs):
+    """profiler.span(...) or a no-op context when profiling is not used."""
+    if profiler is None:
+        return nullcontext({})
+    return profiler.span(stage, **attrs)
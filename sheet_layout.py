@@ -0,0 +1,11 @@
+"""Layout of the source exports and the Master Sheet, shared by the pipeline and the UI.
+
+Kept free of third-party imports so that pages which only need these constants (e.g. the Dashboard) do not
+load openpyxl through processing.py.
+"""
+
+# Kolom yang dibutuhkan dari file sumber; header berada di baris ke-2
+SOURCE_COLUMNS = ("Student Code", "Course Code", "Site Name")
+SOURCE_HEADER_ROW = 2
+# Baris data pertama di sheet template (baris 1 adalah header)
+SHEET_FIRST_DATA_ROW = 2
@@ -0,0 +1,136 @@
+"""Site-name index shared by counting, template update, workbook write-back and the Dashboard.
+
+Site names are compared by a normalized key (by default: surrounding whitespace removed, Unicode NFKC,
+case-folded), so "Acme Corp", "acme corp " and "ＡＣＭＥ Corp" are the same partner. The index is built
+once per dataset, answers lookups in O(1) and reports names that occur more than once instead of silently
+using one of them.
+"""
+import sys
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Normalization steps applied, in order, to every site name before it is compared
+SITE_NAME_NORMALIZATION = ("strip", "nfkc", "casefold")
+
+_NORMALIZERS = {
+    "strip": str.strip,
+    "collapse_spaces": lambda text: " ".join(text.split()),
+    "nfkc": lambda text: unicodedata.normalize("NFKC", text),
+    "casefold": str.casefold,
+}
+
+
+def normalize_site_name(value, normalization=SITE_NAME_NORMALIZATION):
+    """Comparison key of one site name; None for missing or blank names (they never match)."""
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    text = value if isinstance(value, str) else str(value)
+    for step in normalization:
+        text = _NORMALIZERS[step](text)
+    return text or None
+
+
+class SiteIndex:
+    """Positions of site names (e.g. template rows) by normalized key; the first position of a key wins."""
+
+    def __init__(self, names, normalization=SITE_NAME_NORMALIZATION):
+        unknown = [step for step in normalization if step not in _NORMALIZERS]
+        if unknown:
+            raise ValueError(f"Unknown site name normalization step(s): {', '.join(unknown)}")
+        self.normalization = tuple(normalization)
+        self.names = np.asarray(list(names), dtype=object)
+        self.keys = [self.key(name) for name in self.names]
+        self._first = {}
+        self._duplicates = {}
+        self._add_positions(0)
+
+    def _add_positions(self, start: int):
+        for pos in range(start, len(self.keys)):
+            key = self.keys[pos]
+            if key is None:
+                continue
+            first = self._first.setdefault(key, pos)
+            if first != pos:
+                self._duplicates.setdefault(key, [first]).append(pos)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def key(self, name):
+        return normalize_site_name(name, self.normalization)
+
+    def position(self, name) -> int | None:
+        """First position whose name has the same key as `name`, or None."""
+        key = self.key(name)
+        return None if key is None else self._first.get(key)
+
+    def unique_names(self) -> list:
+        """One name per key (as at its first position), in order of first appearance."""
+        return [self.names[pos] for pos in self._first.values()]
+
+    def positions_of(self, names) -> np.ndarray:
+        """First position per name (-1 when not found), as an int64 array."""
+        first = self._first
+        return np.fromiter(
+            (first.get(key, -1) if key is not None else -1 for key in map(self.key, names)),
+            dtype=np.int64,
+            count=len(names),
+        )
+
+    def append(self, names) -> "SiteIndex":
+        """Index of the same names followed by `names` (e.g. rows appended to the template)."""
+        extended = object.__new__(SiteIndex)
+        extended.normalization = self.normalization
+        extended.names = np.concatenate([self.names, np.asarray(list(names), dtype=object)])
+        extended.keys = self.keys + [self.key(name) for name in extended.names[len(self.names):]]
+        extended._first = dict(self._first)
+        extended._duplicates = {key: list(positions) for key, positions in self._duplicates.items()}
+        extended._add_positions(len(self.names))
+        return extended
+
+    def canonical_counts(self, site_counts: pd.Series) -> pd.Series:
+        """Merge counts whose names share a key and name each site as it appears in the index.
+
+        Sites found in the index take the name of their first position; other sites keep the first name
+        seen for their key. Order follows the first appearance of each key in `site_counts`.
+        """
+        totals, labels = {}, {}
+        for name, count, key in zip(site_counts.index, site_counts.to_numpy(), map(self.key, site_counts.index)):
+            group = key if key is not None else (None, name)
+            if group in totals:
+                totals[group] += count
+                continue
+            totals[group] = count
+            pos = self._first.get(key) if key is not None else None
+            labels[group] = name if pos is None else self.names[pos]
+        return pd.Series(
+            list(totals.values()),
+            index=pd.Index(list(labels.values()), dtype=object, name=site_counts.index.name),
+            name=site_counts.name,
+            dtype=site_counts.dtype,
+        )
+
+    def duplicates(self, offset: int = 0) -> pd.DataFrame:
+        """Names sharing a key with an earlier position: key, position (+offset, e.g. the sheet row) and name.
+        Lookups use the first position of each key."""
+        records = [
+            (key, pos + offset, self.names[pos])
+            for key, positions in self._duplicates.items()
+            for pos in positions
+        ]
+        return pd.DataFrame.from_records(records, columns=["key", "position", "name"])
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the index (the name objects themselves are shared with the source)."""
+        return (
+            self.names.nbytes
+            + sys.getsizeof(self.keys)
+            + sum(sys.getsizeof(key) for key in self.keys if key is not None)
+            + sys.getsizeof(self._first)
+        )
+
+    @property
+    def has_duplicates(self) -> bool:
+        return bool(self._duplicates)
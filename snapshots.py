@@ -0,0 +1,141 @@
+"""Columnar snapshots of stored runs (Arrow IPC files next to the database), keyed by run_id.
+
+A snapshot holds exactly the wide table load_run_from_db would rebuild from SQLite, so the Dashboard can
+open a run by memory-mapping one file instead of replaying master_values. Only the latest runs keep a
+snapshot (see storage.SNAPSHOTS_KEPT and prune_snapshots). pyarrow is optional: without it (or when a
+snapshot is missing, unreadable or belongs to another database) runs are simply loaded from the database.
+"""
+import importlib.util
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# pyarrow itself is imported on first use (see _pyarrow) to keep module import cheap
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Body compression of the IPC file (None, "lz4" or "zstd"). Compressed buffers must be decompressed on
+# read, so the default keeps them uncompressed: numeric columns are then mapped without any copy.
+SNAPSHOT_COMPRESSION = None
+
+logger = logging.getLogger(__name__)
+
+
+def _pyarrow():
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+
+    return pa
+
+
+def snapshot_dir(db_path: Path) -> Path:
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_snapshots")
+
+
+def snapshot_path(db_path: Path, run_id: int) -> Path:
+    return snapshot_dir(db_path) / f"run_{int(run_id)}.arrow"
+
+
+def write_snapshot(db_path: Path, run_id: int, df: pd.DataFrame, meta: dict) -> Path | None:
+    """Write `df` (site column first, then float categories) as the snapshot of `run_id`.
+
+    Returns the path, or None when pyarrow is missing or the table cannot be represented (e.g. duplicate
+    column names). Errors are logged, never raised: the database stays the source of truth.
+    """
+    if not PYARROW_AVAILABLE or df is None or not df.columns.is_unique:
+        return None
+    path = snapshot_path(db_path, run_id)
+    try:
+        pa = _pyarrow()
+        site_col = df.columns[0]
+        arrays = [pa.array(df[site_col].astype(str).to_numpy(dtype=object), type=pa.string())]
+        # from_pandas=False: NaN stays a float value instead of a null, so columns map back without a copy
+        arrays += [pa.array(df[col].to_numpy(dtype=float), from_pandas=False) for col in df.columns[1:]]
+        schema = pa.schema(
+            [pa.field(str(col), array.type) for col, array in zip(df.columns, arrays)],
+            metadata={"meta": json.dumps(meta)},
+        )
+        table = pa.Table.from_arrays(arrays, schema=schema)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".arrow.tmp")
+        options = pa.ipc.IpcWriteOptions(compression=SNAPSHOT_COMPRESSION)
+        with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        return path
+    except Exception:
+        logger.exception("Failed to write snapshot for run %s", run_id)
+        return None
+
+
+def _remove(path: Path) -> bool:
+    # Di Windows file yang masih di-memory-map (run di cache) tidak bisa dihapus; coba lagi saat prune berikutnya
+    try:
+        path.unlink(missing_ok=True)
+        return True
+    except OSError as e:
+        logger.warning("Could not delete snapshot %s (retried at the next prune): %s", path.name, e)
+        return False
+
+
+def delete_snapshot(db_path: Path, run_id: int) -> bool:
+    """Delete the snapshot of `run_id`. Errors are logged, never raised; returns whether it is gone."""
+    return _remove(snapshot_path(db_path, run_id))
+
+
+def prune_snapshots(db_path: Path, keep_run_ids) -> int:
+    """Delete every snapshot (and leftover temporary file) except those of keep_run_ids. Returns how many.
+
+    Files that cannot be deleted yet (e.g. still memory-mapped on Windows) are logged and left for the
+    next prune.
+    """
+    directory = snapshot_dir(db_path)
+    if not directory.exists():
+        return 0
+    keep = {snapshot_path(db_path, run_id).name for run_id in keep_run_ids}
+    removed = 0
+    for path in list(directory.glob("run_*.arrow")) + list(directory.glob("run_*.arrow.tmp")):
+        if path.name not in keep and _remove(path):
+            removed += 1
+    return removed
+
+
+def read_snapshot(db_path: Path, run_id: int, created_at: str | None = None) -> dict | None:
+    """Memory-map the snapshot of `run_id`. Returns {df, meta} like load_run_from_db, or None.
+
+    With created_at (runs.created_at) a snapshot written for another run with the same id, e.g. before
+    the database was recreated, is ignored.
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+    path = snapshot_path(db_path, run_id)
+    if not path.exists():
+        return None
+    try:
+        pa = _pyarrow()
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        meta = json.loads(table.schema.metadata[b"meta"])
+        if meta.get("run_id") != run_id or (created_at is not None and meta.get("created_at") != created_at):
+            return None
+        # split_blocks: every numeric column stays a view on the mapped file instead of one consolidated copy
+        df = table.to_pandas(split_blocks=True)
+        df = df.set_axis([meta["site_name_header"]] + list(meta["categories"]), axis=1)
+        return {"df": df, "meta": meta}
+    except Exception as e:
+        logger.warning("Ignoring unreadable snapshot for run %s: %s", run_id, e)
+        return None
+
+
+def snapshot_frame(site_names: np.ndarray, categories: list[str], matrix: np.ndarray, site_name_header: str) -> pd.DataFrame:
+    """The wide table of a freshly saved run in the layout load_run_from_db returns: sites in the order
+    SQLite returns them (by name), one float column per category."""
+    order = np.argsort(site_names.astype(str), kind="stable")
+    df = pd.DataFrame(matrix[order], columns=pd.Index(categories, dtype=object))
+    df.insert(0, site_name_header, site_names[order])
+    return df
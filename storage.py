@@ -0,0 +1,927 @@
+"""SQLite persistence of processed Master Sheet runs."""
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analytics import summarize_category
+from snapshots import delete_snapshot, prune_snapshots, read_snapshot, snapshot_frame, write_snapshot
+
+DB_PATH = Path(__file__).with_name("master_sheet.db")
+# Rows fetched per round-trip when rebuilding a run from master_values
+LOAD_CHUNK_ROWS = 100_000
+# Rows per executemany batch when saving a run; every batch is its own short write transaction, so other
+# writers (e.g. job status updates) never wait longer than one batch for the lock
+SAVE_CHUNK_ROWS = 50_000
+# Page cache per connection, in KiB
+SQLITE_CACHE_KIB = 64_000
+# Store runs as deltas against the previous run, with a full checkpoint at least every CHECKPOINT_INTERVAL runs
+INCREMENTAL_STORAGE = True
+CHECKPOINT_INTERVAL = 10
+# Also write each run as an Arrow snapshot next to the database and load runs from it (needs pyarrow)
+SNAPSHOTS_ENABLED = True
+# Runs that keep a snapshot (the latest ones); older snapshots are deleted after each save
+SNAPSHOTS_KEPT = 5
+# How long a connection waits for another writer's lock before raising "database is locked"
+BUSY_TIMEOUT_MS = 5_000
+# How long job status writes keep retrying (with backoff) while the database stays locked
+JOB_WRITE_RETRY_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+# Schema migrations, applied in order exactly once per database; PRAGMA user_version stores how many ran.
+_MIGRATIONS = [
+    (
+        """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            site_name_header TEXT NOT NULL,
+            columns_json TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS master_values (
+            run_id INTEGER NOT NULL,
+            site_name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            value REAL,
+            PRIMARY KEY (run_id, site_name, category),
+            FOREIGN KEY(run_id) REFERENCES runs(id) ON DELETE CASCADE
+        )
+        """,
+    ),
+    (
+        # History lookups: one partner/category across runs, and one category across runs
+        "CREATE INDEX IF NOT EXISTS idx_master_values_site_category ON master_values (site_name, category, run_id)",
+        "CREATE INDEX IF NOT EXISTS idx_master_values_category_run ON master_values (category, run_id, value)",
+        "CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at)",
+    ),
+    (
+        # Incremental storage: NULL = full snapshot (checkpoint); otherwise the run only stores the cells that
+        # changed since the previous run, and is rebuilt from this checkpoint plus every run after it.
+        "ALTER TABLE runs ADD COLUMN checkpoint_run_id INTEGER REFERENCES runs(id)",
+    ),
+    (
+        # Dashboard KPIs per run and category, computed once when the run is saved (see analytics.summarize_category)
+        """
+        CREATE TABLE IF NOT EXISTS run_aggregates (
+            run_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            total REAL,
+            mean REAL,
+            sites INTEGER NOT NULL,
+            nonzero INTEGER NOT NULL,
+            max_site TEXT,
+            max_value REAL,
+            min_site TEXT,
+            min_value REAL,
+            histogram_json TEXT NOT NULL,
+            ranking_json TEXT NOT NULL,
+            PRIMARY KEY (run_id, category),
+            FOREIGN KEY(run_id) REFERENCES runs(id) ON DELETE CASCADE
+        )
+        """,
+    ),
+    (
+        # Stage timings of the pipeline that produced the run (profiling.Profiler.to_dict as JSON)
+        "ALTER TABLE runs ADD COLUMN profile_json TEXT",
+    ),
+    (
+        # Background processing jobs (see jobs.py); status: queued -> running -> done | failed
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT,
+            stages_done INTEGER NOT NULL DEFAULT 0,
+            rows INTEGER,
+            result_name TEXT,
+            result_path TEXT,
+            run_id INTEGER REFERENCES runs(id) ON DELETE SET NULL,
+            result_json TEXT,
+            profile_json TEXT,
+            error TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)",
+    ),
+    (
+        # Watermarks of incrementally processed sources (see watermarks.py): rows and hash of the processed
+        # prefix plus the cumulative counts per site, keyed by (source identity, target column)
+        """
+        CREATE TABLE IF NOT EXISTS source_watermarks (
+            source_key TEXT NOT NULL,
+            target_column TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            aggregation_json TEXT NOT NULL,
+            rows INTEGER NOT NULL,
+            prefix_hash TEXT NOT NULL,
+            counts_json TEXT NOT NULL,
+            PRIMARY KEY (source_key, target_column)
+        )
+        """,
+    ),
+    (
+        # Server process that runs a job (jobs.JOB_OWNER); its jobs are failed once that process is gone
+        "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    ),
+    (
+        # Both history indexes were updated in random key order on every insert (about 3x the cost of a full
+        # save). History queries now look up their window's run ids through the primary key instead.
+        "DROP INDEX IF EXISTS idx_master_values_site_category",
+        "DROP INDEX IF EXISTS idx_master_values_category_run",
+    ),
+    (
+        # Runs are saved in several short transactions (see save_result_to_db); 0 until the last one commits.
+        # Readers only see complete runs.
+        "ALTER TABLE runs ADD COLUMN complete INTEGER NOT NULL DEFAULT 1",
+    ),
+    (
+        # Delta runs: the run they were computed against, so a run whose chain lost a run (e.g. deleted by
+        # hand) is detected instead of being rebuilt without that run's changes (see _chain_run_ids)
+        "ALTER TABLE runs ADD COLUMN base_run_id INTEGER",
+    ),
+]
+
+# Process-wide connection manager: one connection per (thread, database), configured once when opened.
+_local = threading.local()
+_schema_lock = threading.Lock()
+_initialized_dbs: set[str] = set()
+# Saves of this process run one at a time (e.g. two background jobs), so each delta has the latest run as base
+_save_lock = threading.Lock()
+
+def _db_key(db_path=None) -> str:
+    return str(Path(db_path or DB_PATH).resolve())
+
+def _get_conn(db_path=None):
+    """Return this thread's connection to the database, opening and configuring it on first use."""
+    key = _db_key(db_path)
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(key)
+    if conn is None:
+        # check_same_thread=False allows usage across Streamlit threads
+        conn = sqlite3.connect(key, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        # WAL lets Dashboard readers keep reading while another session saves a run
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+        connections[key] = conn
+    return conn
+
+def close_connections():
+    """Close this thread's connections and forget which databases were initialized (e.g. after deleting a file)."""
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
+    with _schema_lock:
+        _initialized_dbs.clear()
+
+def init_db(db_path=None):
+    """Create or upgrade the schema; runs the pending migrations once per process and database."""
+    key = _db_key(db_path)
+    if key in _initialized_dbs:
+        return
+    with _schema_lock:
+        if key in _initialized_dbs:
+            return
+        conn = _get_conn(db_path)
+        # BEGIN IMMEDIATE serializes concurrent migrators (other processes) on the same file
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, statements in enumerate(_MIGRATIONS[version:], start=version + 1):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version={number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        _initialized_dbs.add(key)
+
+def _numeric_matrix(result_df: pd.DataFrame, categories: list[str]) -> np.ndarray:
+    """Coerce every category column to float in one pass per column (non-numeric → NaN)."""
+    columns_by_name = {str(col): col for col in result_df.columns}
+    matrix = np.full((len(result_df), len(categories)), np.nan)
+    for pos, cat in enumerate(categories):
+        col = columns_by_name.get(cat)
+        if col is None:
+            continue
+        series = result_df[col]
+        if isinstance(series, pd.DataFrame):  # duplicate column labels
+            series = series.iloc[:, 0]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            continue
+        matrix[:, pos] = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return matrix
+
+def _iter_value_rows(run_id: int, site_names: np.ndarray, categories: list[str], matrix: np.ndarray, mask: np.ndarray | None = None):
+    """Melt the wide matrix into (run_id, site_name, category, value) rows, about SAVE_CHUNK_ROWS at a time.
+
+    With `mask`, only the cells where it is True are emitted.
+    """
+    n_cats = len(categories)
+    if n_cats == 0:
+        return
+    sites_per_chunk = max(1, SAVE_CHUNK_ROWS // n_cats)
+    category_array = np.array(categories, dtype=object)
+    for start in range(0, len(site_names), sites_per_chunk):
+        block = matrix[start:start + sites_per_chunk]
+        if mask is None:
+            site_idx, cat_idx = np.divmod(np.arange(block.size), n_cats)
+        else:
+            site_idx, cat_idx = np.nonzero(mask[start:start + sites_per_chunk])
+        if not len(site_idx):
+            continue
+        values = block[site_idx, cat_idx]
+        out = values.astype(object)
+        out[np.isnan(values)] = None
+        yield list(zip(
+            itertools.repeat(run_id),
+            site_names[start + site_idx].tolist(),
+            category_array[cat_idx].tolist(),
+            out.tolist(),
+        ))
+
+def _chain_run_ids(conn, run_id: int) -> list[int] | None:
+    """Runs whose values rebuild `run_id`: its checkpoint, the deltas in between and the run itself, oldest
+    first. None when one of them is missing or incomplete."""
+    chain = []
+    current, checkpoint_id = run_id, None
+    while current is not None:
+        row = conn.execute(
+            "SELECT COALESCE(checkpoint_run_id, id), base_run_id FROM runs WHERE id = ? AND complete = 1", (current,)
+        ).fetchone()
+        if row is None or (checkpoint_id is not None and row[0] != checkpoint_id):
+            return None
+        checkpoint_id, base_id = row
+        chain.append(current)
+        if current == checkpoint_id:
+            return chain[::-1]
+        if base_id is None:
+            # Delta dari sebelum base_run_id dicatat: basisnya run lengkap sebelumnya
+            base_id = conn.execute("SELECT MAX(id) FROM runs WHERE id < ? AND complete = 1", (current,)).fetchone()[0]
+        current = base_id
+    return None
+
+def _delta_base(conn, site_name_header: str, categories: list[str], site_names: np.ndarray):
+    """Return (previous run id, checkpoint_run_id, previous wide df) when the new run can be stored as a
+    delta, else None.
+
+    A full checkpoint is written instead when there is no previous run, the header or categories changed,
+    sites were removed, the previous run cannot be rebuilt (a run of its chain is missing), or the current
+    chain already holds CHECKPOINT_INTERVAL runs.
+    """
+    if not INCREMENTAL_STORAGE:
+        return None
+    prev = conn.execute(
+        "SELECT id, COALESCE(checkpoint_run_id, id), site_name_header, columns_json FROM runs WHERE complete = 1 "
+        "ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    if prev is None:
+        return None
+    prev_id, checkpoint_id, prev_header, prev_columns = prev
+    if prev_header != site_name_header or json.loads(prev_columns) != categories:
+        return None
+    chain = _chain_run_ids(conn, prev_id)
+    if chain is None:
+        logger.warning("Run %s cannot be rebuilt (a run of its chain is missing); saving a full checkpoint", prev_id)
+        return None
+    if len(chain) >= CHECKPOINT_INTERVAL:
+        return None
+    prev_df = _read_wide_values(conn, chain, site_name_header, categories)
+    if prev_df is None or not prev_df.iloc[:, 0].isin(site_names).all():
+        return None
+    return prev_id, checkpoint_id, prev_df
+
+def _changed_cells(prev_df: pd.DataFrame, site_names: np.ndarray, categories: list[str], matrix: np.ndarray) -> np.ndarray:
+    """Mask of cells that differ from the previous run (NaN == NaN); every cell of a new site counts as changed."""
+    prev_df = prev_df.loc[:, ~prev_df.columns.duplicated()]
+    prev_df = prev_df.set_index(prev_df.columns[0])
+    prev_matrix = prev_df[categories].reindex(site_names).to_numpy(dtype=float)
+    same = (matrix == prev_matrix) | (np.isnan(matrix) & np.isnan(prev_matrix))
+    changed = ~same
+    changed[~pd.Index(site_names).isin(prev_df.index)] = True
+    return changed
+
+def _run_aggregate_rows(run_id: int, site_names: np.ndarray, categories: list[str], matrix: np.ndarray) -> list[tuple]:
+    """run_aggregates rows holding the Dashboard summary of every category (missing values count as 0)."""
+    rows = []
+    for pos, cat in enumerate(categories):
+        summary = summarize_category(site_names, np.nan_to_num(matrix[:, pos], nan=0.0))
+        rows.append((
+            run_id, cat, summary["total"], summary["mean"], summary["sites"], summary["nonzero"],
+            summary["max_site"], summary["max_value"], summary["min_site"], summary["min_value"],
+            json.dumps(summary["histogram"]), json.dumps(summary["ranking"]),
+        ))
+    return rows
+
+def _write_run_aggregates(cursor, rows: list[tuple]):
+    cursor.executemany(
+        """
+        INSERT OR REPLACE INTO run_aggregates (
+            run_id, category, total, mean, sites, nonzero, max_site, max_value, min_site, min_value,
+            histogram_json, ranking_json
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+
+def load_run_aggregates(run_id: int, db_path: Path | None = None) -> dict:
+    """Stored summaries of a run: {category: summary} in the format of analytics.summarize_category.
+    Empty for runs saved before aggregates existed."""
+    if not Path(db_path or DB_PATH).exists():
+        return {}
+    init_db(db_path)
+    rows = _get_conn(db_path).execute(
+        """
+        SELECT category, total, mean, sites, nonzero, max_site, max_value, min_site, min_value,
+               histogram_json, ranking_json
+        FROM run_aggregates WHERE run_id = ?
+        """,
+        (run_id,),
+    ).fetchall()
+    return {
+        category: {
+            "total": total,
+            "mean": float("nan") if mean is None else mean,
+            "sites": sites,
+            "nonzero": nonzero,
+            "max_site": max_site,
+            "max_value": max_value,
+            "min_site": min_site,
+            "min_value": min_value,
+            "histogram": json.loads(histogram_json),
+            "ranking": json.loads(ranking_json),
+        }
+        for (category, total, mean, sites, nonzero, max_site, max_value, min_site, min_value,
+             histogram_json, ranking_json) in rows
+    }
+
+def save_result_to_db(result_df: pd.DataFrame, header: list[str], db_path: Path | None = None) -> dict:
+    """Persist a processed wide table into SQLite in a normalized form.
+
+    With INCREMENTAL_STORAGE the run stores only the cells that changed since the previous run
+    (see _delta_base); loads rebuild it from the nearest checkpoint.
+    Returns metadata for the run: {run_id, created_at, site_name_header, categories, storage,
+    checkpoint_run_id, rows_written, rows_per_sec}
+
+    Values are inserted in batches of SAVE_CHUNK_ROWS, each committed on its own, so no transaction holds
+    the write lock for the whole save. The run is marked complete in the last transaction; until then
+    readers do not see it, and a failed save removes it again.
+    """
+    if not isinstance(result_df, pd.DataFrame) or not header or len(header) < 1:
+        return {}
+    init_db(db_path)
+    site_name_header = str(header[0])
+    categories = [str(c) for c in header[1:]]
+    created_at = datetime.utcnow().isoformat()
+
+    started = time.perf_counter()
+    columns_by_name = {str(col): col for col in result_df.columns}
+    if site_name_header in columns_by_name:
+        site_series = result_df[columns_by_name[site_name_header]]
+        if isinstance(site_series, pd.DataFrame):
+            site_series = site_series.iloc[:, 0]
+    else:
+        site_series = pd.Series([None] * len(result_df), index=result_df.index, dtype=object)
+    has_site = site_series.notna().to_numpy()
+    site_names = site_series[has_site].astype(str).to_numpy(dtype=object)
+    # Each (site, category) is stored once; as with INSERT OR REPLACE, the last duplicate row wins
+    unique_categories = list(dict.fromkeys(categories))
+    last_row = ~pd.Index(site_names).duplicated(keep="last")
+    site_names = site_names[last_row]
+    matrix = _numeric_matrix(result_df, unique_categories)[has_site][last_row]
+
+    rows_written = 0
+    conn = _get_conn(db_path)
+    with _save_lock:
+        # Basis delta dibaca tanpa lock tulis (WAL: penulis lain tidak terhalang selama pembacaan)
+        base = _delta_base(conn, site_name_header, categories, site_names)
+        base_run_id, checkpoint_run_id, mask = None, None, None
+        if base is not None:
+            base_run_id, checkpoint_run_id, prev_df = base
+            mask = _changed_cells(prev_df, site_names, unique_categories, matrix)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            latest_id = conn.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+            # Another process inserted a run since the base was read: store a full checkpoint instead
+            if base is not None and base_run_id != latest_id:
+                base_run_id, checkpoint_run_id, mask = None, None, None
+            cursor = conn.execute(
+                "INSERT INTO runs (created_at, site_name_header, columns_json, checkpoint_run_id, base_run_id, complete) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (created_at, site_name_header, json.dumps(categories), checkpoint_run_id, base_run_id),
+            )
+            run_id = cursor.lastrowid
+        try:
+            for rows_to_insert in _iter_value_rows(run_id, site_names, unique_categories, matrix, mask):
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO master_values (run_id, site_name, category, value) VALUES (?, ?, ?, ?)",
+                        rows_to_insert,
+                    )
+                rows_written += len(rows_to_insert)
+            aggregate_rows = _run_aggregate_rows(run_id, site_names, unique_categories, matrix)
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                _write_run_aggregates(conn.cursor(), aggregate_rows)
+                conn.execute("UPDATE runs SET complete = 1 WHERE id = ?", (run_id,))
+        except BaseException:
+            # Run yang belum lengkap dihapus (nilai ikut terhapus lewat ON DELETE CASCADE)
+            try:
+                with conn:
+                    conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+            except sqlite3.Error:
+                logger.exception("Could not remove incomplete run %s", run_id)
+            raise
+
+    elapsed = time.perf_counter() - started
+    rows_per_sec = rows_written / elapsed if elapsed > 0 else float(rows_written)
+    storage_kind = "full" if checkpoint_run_id is None else "delta"
+
+    # Columnar copy of the run for fast Dashboard loads (duplicate or empty layouts are loaded from SQLite)
+    if SNAPSHOTS_ENABLED:
+        try:
+            _write_run_snapshot(db_path, run_id, created_at, site_name_header, categories, site_names, matrix)
+        except Exception:
+            # Run sudah tersimpan; snapshot hanya salinan untuk memuat lebih cepat
+            logger.exception("Failed to update snapshots after saving run %s", run_id)
+    logger.info("Saved run %s (%s): %d rows in %.3fs (%.0f rows/s)", run_id, storage_kind, rows_written, elapsed, rows_per_sec)
+    return {
+        "run_id": run_id,
+        "created_at": created_at,
+        "site_name_header": site_name_header,
+        "categories": categories,
+        "storage": storage_kind,
+        "checkpoint_run_id": checkpoint_run_id,
+        "rows_written": rows_written,
+        "rows_per_sec": rows_per_sec,
+    }
+
+def _write_run_snapshot(db_path, run_id: int, created_at: str, site_name_header: str, categories: list[str], site_names: np.ndarray, matrix: np.ndarray):
+    db_file = Path(db_path or DB_PATH)
+    written = None
+    if len(site_names) and len(pd.Index(categories).unique()) == len(categories) > 0:
+        written = write_snapshot(
+            db_file,
+            run_id,
+            snapshot_frame(site_names, categories, matrix, site_name_header),
+            {"run_id": run_id, "created_at": created_at, "site_name_header": site_name_header, "categories": categories},
+        )
+    if written is None:
+        # File lama dengan run_id yang sama (mis. database dibuat ulang) tidak boleh dipakai untuk run ini
+        delete_snapshot(db_file, run_id)
+    with _get_conn(db_path) as conn:
+        keep = [
+            row[0] for row in conn.execute("SELECT id FROM runs WHERE complete = 1 ORDER BY id DESC LIMIT ?", (SNAPSHOTS_KEPT,))
+        ]
+    prune_snapshots(db_file, keep)
+
+def _read_wide_values(conn, run_ids: list[int], site_name_header: str, categories: list[str]) -> pd.DataFrame | None:
+    """Rebuild the wide table of a run from master_values.
+
+    The run is rebuilt from its checkpoint (the first of `run_ids`, see _chain_run_ids) with every later
+    delta applied on top. Rows are streamed in chunks of LOAD_CHUNK_ROWS and reduced to compact (site code, category
+    position, value) arrays, so no per-row Python objects are kept; the wide matrix is filled with
+    vectorized assignments. Sites keep the order in which they are returned by SQLite.
+    """
+    unique_categories = pd.Index(categories).unique()
+    n_cats = len(unique_categories)
+    site_codes_by_name: dict = {}
+    parts = []
+    chunks = pd.read_sql_query(
+        f"SELECT site_name, category, value FROM master_values WHERE run_id IN ({', '.join('?' * len(run_ids))}) "
+        "ORDER BY run_id",
+        conn,
+        params=tuple(run_ids),
+        chunksize=LOAD_CHUNK_ROWS,
+    )
+    for chunk in chunks:
+        chunk_codes, chunk_sites = pd.factorize(chunk["site_name"], sort=False)
+        for site in chunk_sites:
+            site_codes_by_name.setdefault(site, len(site_codes_by_name))
+        global_codes = pd.Index(chunk_sites).map(site_codes_by_name).to_numpy(dtype=np.int64)
+        cat_pos = unique_categories.get_indexer(chunk["category"])
+        keep = cat_pos >= 0
+        rows, cols = global_codes[chunk_codes[keep]], cat_pos[keep]
+        values = pd.to_numeric(chunk["value"], errors="coerce").to_numpy(dtype=float)[keep]
+        # Later runs override earlier ones for the same cell
+        latest = ~pd.Index(rows * max(n_cats, 1) + cols).duplicated(keep="last")
+        parts.append((rows[latest], cols[latest], values[latest]))
+
+    if not site_codes_by_name:
+        return None
+    matrix = np.full((len(site_codes_by_name), n_cats), np.nan)
+    for rows, cols, values in parts:
+        matrix[rows, cols] = values
+    df = pd.DataFrame(matrix, columns=unique_categories)
+    df.insert(0, site_name_header, list(site_codes_by_name))
+    if len(run_ids) > 1:
+        # Sites added by deltas come last in the fetch; restore the site order of a full snapshot
+        df = df.sort_values(site_name_header, kind="stable", ignore_index=True)
+    # Ensure column order: site name first, then categories
+    return df[[site_name_header] + categories]
+
+def get_latest_run_id(db_path: Path | None = None) -> int | None:
+    """Return the id of the most recent run, or None when nothing has been saved yet."""
+    if not Path(db_path or DB_PATH).exists():
+        return None
+    init_db(db_path)
+    with _get_conn(db_path) as conn:
+        row = conn.execute("SELECT id FROM runs WHERE complete = 1 ORDER BY id DESC LIMIT 1").fetchone()
+    return row[0] if row else None
+
+def load_run_from_db(run_id: int, db_path: Path | None = None) -> dict | None:
+    """Load one run and reconstruct a wide DataFrame.
+    The run's snapshot is memory-mapped when one exists; otherwise the run is rebuilt from SQLite (None when
+    a run it is rebuilt from is missing).
+    Returns dict: { df, meta }
+    """
+    if not Path(db_path or DB_PATH).exists():
+        return None
+    init_db(db_path)
+    with _get_conn(db_path) as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT id, created_at, site_name_header, columns_json FROM runs WHERE id = ? AND complete = 1",
+            (run_id,),
+        )
+        row = c.fetchone()
+        if not row:
+            return None
+        run_id, created_at, site_name_header, columns_json = row
+        if SNAPSHOTS_ENABLED:
+            snapshot = read_snapshot(Path(db_path or DB_PATH), run_id, created_at=created_at)
+            if snapshot is not None:
+                return snapshot
+        categories = json.loads(columns_json)
+        chain = _chain_run_ids(conn, run_id)
+        if chain is None:
+            logger.error("Run %s cannot be rebuilt: its checkpoint or an earlier delta is missing", run_id)
+            return None
+        df = _read_wide_values(conn, chain, site_name_header, categories)
+
+    if df is None:
+        return None
+    meta = {"run_id": run_id, "created_at": created_at, "site_name_header": site_name_header, "categories": categories}
+    return {"df": df, "meta": meta}
+
+
+def load_latest_from_db(db_path: Path | None = None) -> dict | None:
+    """Load the most recent run and reconstruct a wide DataFrame.
+    Returns dict: { df, meta }
+    """
+    run_id = get_latest_run_id(db_path)
+    if run_id is None:
+        return None
+    return load_run_from_db(run_id, db_path)
+
+
+# --- Run history ---
+def list_runs(limit_runs: int = 50, db_path: Path | None = None) -> pd.DataFrame:
+    """Most recent runs, newest first: run_id, created_at, site_name_header, categories."""
+    columns = ["run_id", "created_at", "site_name_header", "categories"]
+    if not Path(db_path or DB_PATH).exists():
+        return pd.DataFrame(columns=columns)
+    init_db(db_path)
+    runs = pd.read_sql_query(
+        "SELECT id AS run_id, created_at, site_name_header, columns_json FROM runs WHERE complete = 1 "
+        "ORDER BY id DESC LIMIT ?",
+        _get_conn(db_path),
+        params=(int(limit_runs),),
+    )
+    runs["categories"] = runs.pop("columns_json").map(json.loads)
+    return runs[columns]
+
+def save_run_profile(run_id: int, profile: dict, db_path: Path | None = None):
+    """Attach a pipeline profile (profiling.Profiler.to_dict) to a stored run."""
+    init_db(db_path)
+    with _get_conn(db_path) as conn:
+        conn.execute("UPDATE runs SET profile_json = ? WHERE id = ?", (json.dumps(profile, default=str), run_id))
+
+def load_run_profiles(limit_runs: int = 50, db_path: Path | None = None) -> pd.DataFrame:
+    """Stage timings of the most recent profiled runs, one row per (run, stage), oldest run first.
+
+    Columns: run_id, created_at, stage, seconds, peak_mib.
+    """
+    columns = ["run_id", "created_at", "stage", "seconds", "peak_mib"]
+    if not Path(db_path or DB_PATH).exists():
+        return pd.DataFrame(columns=columns)
+    init_db(db_path)
+    rows = _get_conn(db_path).execute(
+        "SELECT id, created_at, profile_json FROM runs WHERE profile_json IS NOT NULL AND complete = 1 "
+        "ORDER BY id DESC LIMIT ?",
+        (int(limit_runs),),
+    ).fetchall()
+    records = [
+        (run_id, created_at, entry.get("stage"), entry.get("seconds"), entry.get("peak_mib"))
+        for run_id, created_at, profile_json in reversed(rows)
+        for entry in json.loads(profile_json).get("spans", [])
+    ]
+    return pd.DataFrame.from_records(records, columns=columns)
+
+def _runs_in_window(conn, limit_runs: int) -> pd.DataFrame:
+    """The last `limit_runs` runs (oldest first) plus the earlier runs of the first run's checkpoint chain.
+
+    Columns: run_id, created_at, checkpoint_run_id, in_window.
+    """
+    recent = pd.read_sql_query(
+        "SELECT id AS run_id, created_at, COALESCE(checkpoint_run_id, id) AS checkpoint_run_id "
+        "FROM runs WHERE complete = 1 ORDER BY id DESC LIMIT ?",
+        conn,
+        params=(int(limit_runs),),
+    ).iloc[::-1]
+    if recent.empty:
+        return recent.assign(in_window=pd.Series(dtype=bool))
+    runs = pd.read_sql_query(
+        "SELECT id AS run_id, created_at, COALESCE(checkpoint_run_id, id) AS checkpoint_run_id "
+        "FROM runs WHERE id BETWEEN ? AND ? AND complete = 1 ORDER BY id",
+        conn,
+        params=(int(recent["checkpoint_run_id"].min()), int(recent["run_id"].max())),
+    )
+    runs["in_window"] = runs["run_id"] >= recent["run_id"].min()
+    return runs
+
+def _carry_forward(runs: pd.DataFrame, recorded: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Values in effect at every run, per `key`, from the cells recorded in checkpoints and deltas.
+
+    A delta run only records changed cells, so an unrecorded cell keeps its value from the previous run of
+    the same checkpoint chain. Returns run_id, key, value for every run where the key has a value.
+    """
+    if recorded.empty:
+        return pd.DataFrame(columns=["run_id", key, "value"])
+    recorded = recorded.reset_index(drop=True)
+    grid = pd.MultiIndex.from_product(
+        [runs["run_id"], recorded[key].unique()], names=["run_id", key]
+    ).to_frame(index=False)
+    grid = grid.merge(runs[["run_id", "checkpoint_run_id"]], on="run_id")
+    grid = grid.merge(
+        recorded[["run_id", key]].assign(_src=np.arange(len(recorded), dtype=float)), on=["run_id", key], how="left"
+    )
+    grid = grid.sort_values([key, "run_id"], kind="stable")
+    grid["_src"] = grid.groupby(["checkpoint_run_id", key], sort=False)["_src"].ffill()
+    grid = grid.dropna(subset=["_src"])
+    grid["value"] = recorded["value"].to_numpy(dtype=float)[grid["_src"].to_numpy(dtype=np.int64)]
+    return grid.sort_values(["run_id", key], kind="stable")[["run_id", key, "value"]].reset_index(drop=True)
+
+def load_site_history(
+    site_name: str, category: str | None = None, limit_runs: int = 20, db_path: Path | None = None
+) -> pd.DataFrame:
+    """Values of one partner across the last `limit_runs` runs, oldest first.
+
+    Columns: run_id, created_at, category, value, delta (change since the partner's previous run, per category).
+    """
+    columns = ["run_id", "created_at", "category", "value", "delta"]
+    if not Path(db_path or DB_PATH).exists():
+        return pd.DataFrame(columns=columns)
+    init_db(db_path)
+    conn = _get_conn(db_path)
+    runs = _runs_in_window(conn, limit_runs)
+    if runs.empty:
+        return pd.DataFrame(columns=columns)
+    category_filter = "AND category = ?" if category is not None else ""
+    params = [str(site_name)] + ([str(category)] if category is not None else [])
+    # Satu pencarian primary key (run_id, site_name, ...) per run di jendela
+    run_ids = runs["run_id"].astype(int).tolist()
+    recorded = pd.read_sql_query(
+        f"""
+        SELECT run_id, category, value FROM master_values
+        WHERE run_id IN ({", ".join("?" * len(run_ids))}) AND site_name = ? {category_filter}
+        """,
+        conn,
+        params=run_ids + params,
+    )
+    history = _carry_forward(runs, recorded, "category")
+    history = history.merge(runs[["run_id", "created_at", "in_window"]], on="run_id")
+    history = history[history.pop("in_window")]
+    history["delta"] = history.groupby("category", sort=False)["value"].diff()
+    return history[columns].reset_index(drop=True)
+
+def load_category_trend(category: str, limit_runs: int = 20, db_path: Path | None = None) -> pd.DataFrame:
+    """Aggregates of one category per run over the last `limit_runs` runs, oldest first.
+
+    Columns: run_id, created_at, total, mean, sites, nonzero, delta_total. Missing values count as 0,
+    as in the Dashboard.
+    """
+    columns = ["run_id", "created_at", "total", "mean", "sites", "nonzero", "delta_total"]
+    if not Path(db_path or DB_PATH).exists():
+        return pd.DataFrame(columns=columns)
+    init_db(db_path)
+    conn = _get_conn(db_path)
+    stored = pd.read_sql_query(
+        """
+        WITH recent AS (SELECT id, created_at FROM runs WHERE complete = 1 ORDER BY id DESC LIMIT ?)
+        SELECT r.id AS run_id, r.created_at, a.total, a.mean, a.sites, a.nonzero,
+               EXISTS (SELECT 1 FROM run_aggregates x WHERE x.run_id = r.id) AS has_aggregates
+        FROM recent r LEFT JOIN run_aggregates a ON a.run_id = r.id AND a.category = ?
+        ORDER BY r.id
+        """,
+        conn,
+        params=(int(limit_runs), str(category)),
+    )
+    if stored.empty:
+        return pd.DataFrame(columns=columns)
+    if stored["has_aggregates"].all():
+        # Every run in the window has precomputed aggregates
+        stored = stored[stored["sites"].notna()].reset_index(drop=True)
+        stored["sites"] = stored["sites"].astype("int64")
+        stored["nonzero"] = stored["nonzero"].astype("int64")
+        stored["delta_total"] = stored["total"].diff()
+        return stored[columns]
+
+    # Older runs without aggregates: rebuild the category from the stored cells
+    runs = _runs_in_window(conn, limit_runs)
+    run_ids = runs["run_id"].astype(int).tolist()
+    recorded = pd.read_sql_query(
+        f"SELECT run_id, site_name, value FROM master_values WHERE run_id IN ({', '.join('?' * len(run_ids))}) "
+        "AND category = ?",
+        conn,
+        params=run_ids + [str(category)],
+    )
+    values = _carry_forward(runs, recorded, "site_name")
+    values = values[values["run_id"].isin(runs.loc[runs["in_window"], "run_id"])]
+    values["value"] = values["value"].fillna(0)
+    trend = values.groupby("run_id", sort=True)["value"].agg(
+        total="sum", mean="mean", sites="size", nonzero=lambda v: int((v != 0).sum())
+    ).reset_index()
+    trend = trend.merge(runs[["run_id", "created_at"]], on="run_id")
+    trend["delta_total"] = trend["total"].diff()
+    return trend[columns]
+
+
+# --- Background jobs ---
+_JOB_UPDATABLE = {"status", "stage", "stages_done", "rows", "result_path", "run_id", "result_json", "profile_json", "error"}
+_JOB_JSON_COLUMNS = ("result_json", "profile_json")
+
+def _retry_locked(write, retry_seconds: float):
+    """Run `write` again with exponential backoff while SQLite reports the database locked or busy,
+    for at most `retry_seconds` (on top of the busy timeout of each attempt)."""
+    deadline = time.monotonic() + retry_seconds
+    delay = 0.05
+    while True:
+        try:
+            return write()
+        except sqlite3.OperationalError as exc:
+            message = str(exc).lower()
+            if ("locked" not in message and "busy" not in message) or time.monotonic() + delay > deadline:
+                raise
+            logger.warning("Database busy, retrying job write in %.2fs", delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+def create_job(job_id: str, result_name: str, db_path: Path | None = None, owner: str | None = None):
+    """Register a queued job run by the server process `owner`."""
+    init_db(db_path)
+    now = datetime.utcnow().isoformat()
+
+    def write():
+        with _get_conn(db_path) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, created_at, updated_at, status, result_name, owner) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, now, now, result_name, owner),
+            )
+
+    _retry_locked(write, JOB_WRITE_RETRY_SECONDS)
+
+def update_job(job_id: str, db_path: Path | None = None, retry_seconds: float = JOB_WRITE_RETRY_SECONDS, **fields):
+    """Update job columns (status, stage, stages_done, rows, result_path, run_id, result_json, profile_json, error).
+    result_json/profile_json are given as Python objects. A locked database is retried for `retry_seconds`."""
+    unknown = set(fields) - _JOB_UPDATABLE
+    if unknown:
+        raise ValueError(f"Unknown job field(s): {', '.join(sorted(unknown))}")
+    for key in _JOB_JSON_COLUMNS:
+        if fields.get(key) is not None:
+            fields[key] = json.dumps(fields[key], default=str)
+    fields["updated_at"] = datetime.utcnow().isoformat()
+    assignments = ", ".join(f"{key} = ?" for key in fields)
+    init_db(db_path)
+
+    def write():
+        with _get_conn(db_path) as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    _retry_locked(write, retry_seconds)
+
+def _job_from_row(row, columns) -> dict:
+    job = dict(zip(columns, row))
+    for key in _JOB_JSON_COLUMNS:
+        job[key.removesuffix("_json")] = json.loads(job.pop(key)) if job[key] else None
+    return job
+
+def get_job(job_id: str, db_path: Path | None = None) -> dict | None:
+    """One job as a dict (result/profile decoded from JSON), or None."""
+    if not Path(db_path or DB_PATH).exists():
+        return None
+    init_db(db_path)
+    cursor = _get_conn(db_path).execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return _job_from_row(row, [d[0] for d in cursor.description])
+
+def list_jobs(limit: int = 20, db_path: Path | None = None) -> list[dict]:
+    """Most recent jobs, newest first."""
+    if not Path(db_path or DB_PATH).exists():
+        return []
+    init_db(db_path)
+    cursor = _get_conn(db_path).execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (int(limit),))
+    columns = [d[0] for d in cursor.description]
+    return [_job_from_row(row, columns) for row in cursor.fetchall()]
+
+def fail_interrupted_jobs(is_alive, db_path: Path | None = None, job_id: str | None = None) -> int:
+    """Mark queued/running jobs whose owner process is gone as failed. Returns how many.
+
+    is_alive(owner) decides per owner (None for jobs saved before owners were recorded); job_id limits the
+    check to one job.
+    """
+    if not Path(db_path or DB_PATH).exists():
+        return 0
+    init_db(db_path)
+    query = "SELECT DISTINCT owner FROM jobs WHERE status IN ('queued', 'running')"
+    params = ()
+    if job_id is not None:
+        query += " AND id = ?"
+        params = (job_id,)
+    owners = [row[0] for row in _get_conn(db_path).execute(query, params).fetchall()]
+    orphaned = [owner for owner in owners if not is_alive(owner)]
+    if not orphaned:
+        return 0
+    failed = 0
+    with _get_conn(db_path) as conn:
+        for owner in orphaned:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted: the server process running it stopped.', "
+                "updated_at = ? WHERE status IN ('queued', 'running') AND owner IS ?"
+                + (" AND id = ?" if job_id is not None else ""),
+                (datetime.utcnow().isoformat(), owner, *params),
+            )
+            failed += cursor.rowcount
+    return failed
+
+
+# --- Source watermarks ---
+def load_watermark(source_key: str, target_column, db_path: Path | None = None) -> dict | None:
+    """Watermark of (source, target column): {rows, prefix_hash, aggregation, counts, updated_at}, or None.
+    counts is a Series Site Name -> cumulative value."""
+    if not Path(db_path or DB_PATH).exists():
+        return None
+    init_db(db_path)
+    row = _get_conn(db_path).execute(
+        "SELECT updated_at, aggregation_json, rows, prefix_hash, counts_json FROM source_watermarks "
+        "WHERE source_key = ? AND target_column = ?",
+        (source_key, str(target_column)),
+    ).fetchone()
+    if row is None:
+        return None
+    updated_at, aggregation_json, rows, prefix_hash, counts_json = row
+    pairs = json.loads(counts_json)
+    counts = pd.Series(
+        [value for _, value in pairs],
+        index=pd.Index([site for site, _ in pairs], dtype=object, name="Site Name"),
+        name="count",
+        dtype="float64" if any(isinstance(value, float) for _, value in pairs) else "int64",
+    )
+    return {
+        "rows": rows,
+        "prefix_hash": prefix_hash,
+        "aggregation": tuple(json.loads(aggregation_json)),
+        "counts": counts,
+        "updated_at": updated_at,
+    }
+
+def save_watermark(source_key: str, target_column, watermark: dict, db_path: Path | None = None):
+    """Store (replace) the watermark of (source, target column); see load_watermark for the keys."""
+    init_db(db_path)
+    counts = watermark["counts"]
+    pairs = [[site, value] for site, value in zip(counts.index.tolist(), counts.tolist())]
+    with _get_conn(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO source_watermarks "
+            "(source_key, target_column, updated_at, aggregation_json, rows, prefix_hash, counts_json) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                source_key,
+                str(target_column),
+                datetime.utcnow().isoformat(),
+                json.dumps(list(watermark["aggregation"])),
+                int(watermark["rows"]),
+                watermark["prefix_hash"],
+                json.dumps(pairs, default=str),
+            ),
+        )
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modul aplikasi berada langsung di root repo
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,54 @@
+import io
+
+import openpyxl
+
+from processing import OUTPUT_ENGINES, UPDATE_MODES, fill_template
+
+
+def workbook_bytes(wb):
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def make_template():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Master Sheet"
+    ws.append(["Site Name", "Course A", "Course B", "Total"])
+    for row, (site, course_a, course_b) in enumerate([("Acme", 1, 2), ("Beta", None, 5), ("Gamma", 3, 0)], start=2):
+        ws.append([site, course_a, course_b, f"=B{row}+C{row}"])
+    ws["D6"] = "=SUM(D2:D4)"
+    wb.create_sheet("Notes")["A1"] = "='Master Sheet'!D6"
+    return workbook_bytes(wb)
+
+
+def make_source(sites):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Enrolment export"])
+    ws.append(["Student Code", "Course Code", "Site Name"])
+    for i, site in enumerate(sites):
+        ws.append([f"STU{i:05d}", "CRS001", site])
+    return workbook_bytes(wb)
+
+
+def sheet_values(data):
+    wb = openpyxl.load_workbook(io.BytesIO(data))
+    return {ws.title: [[cell.value for cell in row] for row in ws.iter_rows()] for ws in wb.worksheets}
+
+
+def test_streaming_engine_keeps_template_formulas():
+    template = make_template()
+    source = make_source(["Acme", "acme ", "Beta", "New Co"])
+    outputs = {}
+    for engine in OUTPUT_ENGINES:
+        _, _, output = fill_template(io.BytesIO(template), [(io.BytesIO(source), "Course A", UPDATE_MODES[0])], engine=engine)
+        outputs[engine] = sheet_values(output)
+
+    assert outputs["streaming"] == outputs["openpyxl"]
+    master = outputs["streaming"]["Master Sheet"]
+    assert master[1] == ["Acme", 3, 2, "=B2+C2"]
+    assert master[5] == [None, None, None, "=SUM(D2:D4)"]
+    assert master[6] == ["New Co", 1, None, None]
+    assert outputs["streaming"]["Notes"] == [["='Master Sheet'!D6"]]
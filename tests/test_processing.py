@@ -0,0 +1,84 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from processing import UPDATE_MODES, process_data
+
+TEMPLATE_NAMES = ["Acme", "Beta", "acme", None, "  ", "Ｇamma ", "Delta", "Beta"]
+SOURCE_SITES = [
+    "Acme", " ACME", "acme", "Beta ", "gamma", "New Co", "new co ", "  ", None, "Delta", "Acme", "Epsilon", "Beta",
+]
+
+
+def reference_key(name):
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return None
+    return unicodedata.normalize("NFKC", str(name).strip()).casefold() or None
+
+
+def reference_update(source_df, template_df, target_column, mode):
+    """Row-by-row Add/Replace: the first template row with the same normalized name is updated,
+    other sites are appended under the first name seen for them."""
+    counts, labels = {}, {}
+    for _, row in source_df.iterrows():
+        if pd.isna(row["Student Code"]) or pd.isna(row["Course Code"]) or pd.isna(row["Site Name"]):
+            continue
+        site = row["Site Name"]
+        key = reference_key(site) or ("blank", site)
+        counts[key] = counts.get(key, 0) + 1
+        labels.setdefault(key, site)
+
+    rows = template_df.to_dict("records")
+    site_column = template_df.columns[0]
+    first_row = {}
+    for pos, row in enumerate(rows):
+        key = reference_key(row[site_column])
+        if key is not None:
+            first_row.setdefault(key, pos)
+    appended = []
+    for key, count in counts.items():
+        pos = first_row.get(key)
+        if pos is None:
+            appended.append({site_column: labels[key], target_column: count})
+        elif mode == UPDATE_MODES[0]:
+            current = pd.to_numeric(pd.Series([rows[pos][target_column]]), errors="coerce").fillna(0).iloc[0]
+            rows[pos][target_column] = current + count
+        else:
+            rows[pos][target_column] = count
+    return rows, appended
+
+
+def make_frames():
+    template_df = pd.DataFrame({
+        "Site Name": TEMPLATE_NAMES,
+        "Course A": [1, "Y", 5, 7, 2, np.nan, 0, 3],
+        "Course B": range(len(TEMPLATE_NAMES)),
+    })
+    source_df = pd.DataFrame({
+        "Student Code": [f"STU{i}" if i != 10 else None for i in range(len(SOURCE_SITES))],
+        "Course Code": ["CRS001"] * len(SOURCE_SITES),
+        "Site Name": SOURCE_SITES,
+    })
+    return source_df, template_df
+
+
+def comparable(rows, columns):
+    return [[None if pd.isna(row[col]) else float(row[col]) if isinstance(row[col], (int, float)) else row[col]
+             for col in columns] for row in rows]
+
+
+@pytest.mark.parametrize("mode", UPDATE_MODES[:2])
+def test_process_data_matches_row_by_row_reference(mode):
+    source_df, template_df = make_frames()
+    expected_rows, expected_appended = reference_update(source_df, template_df, "Course A", mode)
+
+    result_df = process_data(source_df, template_df, "Course A", mode)
+
+    columns = list(template_df.columns)
+    records = result_df.to_dict("records")
+    assert comparable(records[:len(template_df)], columns) == comparable(expected_rows, columns)
+    appended = sorted(comparable(records[len(template_df):], ["Site Name", "Course A"]))
+    assert appended == sorted(comparable(expected_appended, ["Site Name", "Course A"]))
+    assert result_df["Course B"].iloc[len(template_df):].isna().all()
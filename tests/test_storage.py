@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # Runs are rebuilt from SQLite, not from their Arrow snapshot
+    monkeypatch.setattr(storage, "SNAPSHOTS_ENABLED", False)
+    return tmp_path / "master_sheet.db"
+
+
+def make_run(step):
+    """Result of the step-th processing: values change every step and a new site is added every other step."""
+    sites = ["Acme", "Beta", "Gamma"] + [f"New {i}" for i in range(step // 2)]
+    rng = np.random.default_rng(step)
+    values = rng.integers(0, 3, size=(len(sites), 3)).astype(float)
+    values[step % len(sites), 1] = np.nan
+    df = pd.DataFrame(values, columns=["Course A", "Course B", "Course C"])
+    df.insert(0, "Site Name", sites)
+    return df
+
+
+def save(df, db_path):
+    return storage.save_result_to_db(df, list(df.columns), db_path=db_path)
+
+
+def assert_same_run(loaded, df):
+    loaded = loaded["df"].sort_values("Site Name", ignore_index=True)
+    expected = df.sort_values("Site Name", ignore_index=True)
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+
+
+def test_every_run_of_a_delta_chain_loads_as_saved(db_path, monkeypatch):
+    monkeypatch.setattr(storage, "CHECKPOINT_INTERVAL", 4)
+    frames = [make_run(step) for step in range(7)]
+    metas = [save(df, db_path) for df in frames]
+
+    assert [meta["storage"] for meta in metas] == ["full", "delta", "delta", "delta", "full", "delta", "delta"]
+    assert [meta["checkpoint_run_id"] for meta in metas[1:4]] == [metas[0]["run_id"]] * 3
+    for meta, df in zip(metas, frames):
+        assert_same_run(storage.load_run_from_db(meta["run_id"], db_path=db_path), df)
+
+
+def test_run_with_deleted_checkpoint_is_not_rebuilt(db_path):
+    frames = [make_run(step) for step in range(3)]
+    metas = [save(df, db_path) for df in frames]
+    conn = storage._get_conn(db_path)
+    # Deleted by hand (foreign keys are not enforced by every SQLite tool)
+    conn.execute("PRAGMA foreign_keys=OFF")
+    with conn:
+        conn.execute("DELETE FROM master_values WHERE run_id = ?", (metas[0]["run_id"],))
+        conn.execute("DELETE FROM runs WHERE id = ?", (metas[0]["run_id"],))
+    conn.execute("PRAGMA foreign_keys=ON")
+
+    assert storage.load_run_from_db(metas[2]["run_id"], db_path=db_path) is None
+    meta = save(make_run(3), db_path)
+    assert meta["storage"] == "full"
+    assert_same_run(storage.load_latest_from_db(db_path), make_run(3))
+
+
+def test_run_with_deleted_base_delta_is_not_rebuilt(db_path):
+    frames = [make_run(step) for step in range(4)]
+    metas = [save(df, db_path) for df in frames]
+    with storage._get_conn(db_path) as conn:
+        conn.execute("DELETE FROM runs WHERE id = ?", (metas[1]["run_id"],))
+
+    assert_same_run(storage.load_run_from_db(metas[0]["run_id"], db_path=db_path), frames[0])
+    assert storage.load_run_from_db(metas[3]["run_id"], db_path=db_path) is None
+    meta = save(make_run(4), db_path)
+    assert meta["storage"] == "full"
+    assert_same_run(storage.load_run_from_db(meta["run_id"], db_path=db_path), make_run(4))
+    assert save(make_run(5), db_path)["storage"] == "delta"
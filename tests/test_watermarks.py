@@ -0,0 +1,57 @@
+import openpyxl
+import pandas as pd
+
+from processing import UPDATE_MODES, count_sources, process_batch
+from watermarks import INCREMENTAL_MODE, commit_watermarks, count_jobs, source_key
+
+HEADER = ["No", "Student Code", "Student Name", "Course Code", "Course Name", "Site Name"]
+
+
+def write_source(path, sites):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Enrolment export"])
+    ws.append(HEADER)
+    for i, site in enumerate(sites):
+        ws.append([i + 1, f"STU{i:05d}", "Student", f"CRS{i % 7:03d}", "Course", site])
+    wb.save(path)
+    return path
+
+
+def run(template_df, jobs, db_path):
+    files = [source for source, _, _ in jobs]
+    site_counts, pending = count_jobs(
+        files,
+        jobs,
+        [source_key(source) for source in files],
+        None,
+        lambda files, aggregations: count_sources(files, aggregations=aggregations),
+        db_path=db_path,
+    )
+    result_df, _ = process_batch(template_df, jobs, site_counts=site_counts)
+    commit_watermarks(pending, db_path=db_path)
+    return result_df
+
+
+def test_two_incremental_sources_for_one_column_are_summed(tmp_path):
+    db_path = tmp_path / "master_sheet.db"
+    template_df = pd.DataFrame({"Site Name": ["Acme", "Beta", "Gamma"], "Total": [99, 99, 99]})
+    jan = ["Acme", "Acme", "Beta"]
+    feb = ["Beta", "Gamma", "Acme", "Acme"]
+    jan_path = write_source(tmp_path / "jan.xlsx", jan)
+    feb_path = write_source(tmp_path / "feb.xlsx", feb)
+    jobs = [(jan_path, "Total", INCREMENTAL_MODE), (feb_path, "Total", INCREMENTAL_MODE)]
+
+    first = run(template_df, jobs, db_path)
+    assert first.set_index("Site Name")["Total"].to_dict() == {"Acme": 4, "Beta": 2, "Gamma": 1}
+
+    # Both exports grow; the next run counts only the new rows but still reports the combined totals
+    write_source(jan_path, jan + ["Gamma", "Delta"])
+    write_source(feb_path, feb + ["Beta"])
+    second = run(template_df, jobs, db_path)
+    assert second.set_index("Site Name")["Total"].to_dict() == {"Acme": 4, "Beta": 3, "Gamma": 2, "Delta": 1}
+
+    # Same totals as adding both complete exports onto an empty column
+    adds = [(jan_path, "Total", UPDATE_MODES[0]), (feb_path, "Total", UPDATE_MODES[0])]
+    expected, _ = process_batch(template_df.assign(Total=0), adds)
+    assert second["Total"].tolist() == expected["Total"].tolist()
@@ -0,0 +1,173 @@
+"""Memory-bounded cache of parsed uploads, keyed by the SHA-256 of the uploaded bytes.
+
+Streamlit reruns the whole script on every widget change while the uploaded files stay the same, so
+parsing is keyed by content (plus the sheet/header parameters used) and reused until the entry is evicted.
+Cached values are shared between reruns and sessions and must be treated as read-only.
+"""
+import hashlib
+import io
+import sys
+import threading
+from collections import OrderedDict
+
+import openpyxl
+import pandas as pd
+
+from processing import (
+    AGGREGATIONS,
+    SOURCE_COLUMNS,
+    SOURCE_HEADER_ROW,
+    build_sheet_index,
+    count_sources,
+    read_source_columns,
+)
+from site_index import SITE_NAME_NORMALIZATION, SiteIndex
+
+# Total estimated size of the cached values; the oldest entries are evicted beyond it
+UPLOAD_CACHE_MAX_BYTES = 512 * 2**20
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def estimate_nbytes(value) -> int:
+    """Approximate in-memory size of a cached value (deep for pandas objects and containers)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ParseCache:
+    """Thread-safe key -> parsed value store bounded by `max_bytes`, evicting the oldest entries first."""
+
+    def __init__(self, max_bytes: int = UPLOAD_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = estimate_nbytes(value)
+        with self._lock:
+            if key in self._entries or size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._nbytes += size
+            while self._nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._nbytes -= evicted_size
+
+    def get_or_parse(self, key, parse):
+        """Cached value for `key`, or parse() stored under it. Parsing runs outside the lock."""
+        value = self.get(key)
+        if value is None:
+            value = parse()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "nbytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _read_bytes(uploaded) -> bytes:
+    if hasattr(uploaded, "getvalue"):
+        return uploaded.getvalue()
+    return bytes(uploaded)
+
+
+def parse_template(cache: ParseCache, uploaded, sheet_name: str = "Master Sheet"):
+    """(content hash, DataFrame of `sheet_name`) of an uploaded template."""
+    data = _read_bytes(uploaded)
+    digest = content_hash(data)
+    template_df = cache.get_or_parse(
+        ("template", digest, sheet_name), lambda: pd.read_excel(io.BytesIO(data), sheet_name=sheet_name)
+    )
+    return digest, template_df
+
+
+def _read_sheet_index(data: bytes, sheet_name: str) -> SiteIndex:
+    # Sama dengan build_sheet_index pada workbook penuh, tetapi dari workbook read-only (tanpa memuat style)
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True)
+    try:
+        return build_sheet_index(wb[sheet_name])
+    finally:
+        wb.close()
+
+
+def parse_sheet_index(cache: ParseCache, uploaded, sheet_name: str = "Master Sheet") -> SiteIndex:
+    """SiteIndex of the Site Name column of an uploaded template sheet (positions map to sheet rows,
+    see processing.build_sheet_index)."""
+    data = _read_bytes(uploaded)
+    return cache.get_or_parse(
+        ("sheet_index", content_hash(data), sheet_name, SITE_NAME_NORMALIZATION),
+        lambda: _read_sheet_index(data, sheet_name),
+    )
+
+
+def parse_site_index(cache: ParseCache, uploaded, sheet_name: str = "Master Sheet") -> SiteIndex:
+    """SiteIndex of the first column of the parsed template DataFrame (positions map to DataFrame rows)."""
+    digest, template_df = parse_template(cache, uploaded, sheet_name)
+    return cache.get_or_parse(
+        ("site_index", digest, sheet_name, SITE_NAME_NORMALIZATION),
+        lambda: SiteIndex(template_df[template_df.columns[0]]),
+    )
+
+
+def parse_source_columns(cache: ParseCache, uploaded) -> list:
+    """Column names of an uploaded source file (header row SOURCE_HEADER_ROW), e.g. to choose a sum column."""
+    data = _read_bytes(uploaded)
+    return cache.get_or_parse(
+        ("source_columns", content_hash(data), SOURCE_HEADER_ROW), lambda: read_source_columns(io.BytesIO(data))
+    )
+
+
+def count_uploads(cache: ParseCache, uploads, max_workers: int = 1, aggregations=None) -> list:
+    """Site Name counts per uploaded source file; only files not in the cache are parsed (in parallel if
+    max_workers > 1). aggregations: optional (aggregation, value_column) per file, see count_sources."""
+    datas = [_read_bytes(uploaded) for uploaded in uploads]
+    aggregations = list(aggregations) if aggregations is not None else [(AGGREGATIONS[0], None)] * len(datas)
+    keys = [
+        ("source_counts", content_hash(data), SOURCE_HEADER_ROW, SOURCE_COLUMNS, aggregation)
+        for data, aggregation in zip(datas, aggregations)
+    ]
+    counts = [cache.get(key) for key in keys]
+    missing = [i for i, site_counts in enumerate(counts) if site_counts is None]
+    parsed = count_sources(
+        [io.BytesIO(datas[i]) for i in missing], max_workers=max_workers, aggregations=[aggregations[i] for i in missing]
+    )
+    for i, site_counts in zip(missing, parsed):
+        cache.put(keys[i], site_counts)
+        counts[i] = site_counts
+    return counts
@@ -0,0 +1,92 @@
+"""Incremental processing of append-only source exports ("Incremental" update mode).
+
+For every (source identity, target column) a watermark in SQLite records how many source rows were
+processed, a hash of those rows and the cumulative value per site. The next run hashes the same number of
+rows of the new export. If they are unchanged, only the rows after them are counted and added to the stored
+values; otherwise the whole file is counted again. Either way the target column is replaced by the
+cumulative values, so processing the same export twice never counts a row twice.
+"""
+from pathlib import Path
+
+from processing import AGGREGATIONS, UPDATE_MODES, count_sites_after_prefix, merge_site_counts
+from storage import load_watermark, save_watermark
+
+INCREMENTAL_MODE = UPDATE_MODES[2]
+# Distinct counts cannot be continued from stored totals (a student may appear before and after the watermark)
+_NON_ADDITIVE = frozenset({AGGREGATIONS[1], AGGREGATIONS[2]})
+
+
+def source_key(name) -> str:
+    """Identity of a source export: its file name without folders, case-folded."""
+    return Path(str(name)).name.strip().casefold()
+
+
+def count_incremental(source_file, key: str, target_column, aggregation=(AGGREGATIONS[0], None), db_path=None):
+    """Cumulative counts of one source for the Incremental mode.
+
+    Returns (site_counts, watermark, info). Store the watermark with save_watermark (see commit_watermarks)
+    once the run succeeded. info is a dict with source, target, total_rows, new_rows, full_recount and
+    reason (why the file was counted in full, or None).
+    """
+    aggregation = tuple(aggregation)
+    previous = load_watermark(key, target_column, db_path)
+    reason = None
+    if previous is None:
+        reason = "no watermark yet"
+    elif previous["aggregation"] != aggregation:
+        reason = "aggregation changed"
+    elif aggregation[0] in _NON_ADDITIVE:
+        reason = "distinct counts are always recounted"
+
+    prefix_rows = previous["rows"] if reason is None else 0
+    new_counts, rows, rows_hash, matched = count_sites_after_prefix(
+        source_file, prefix_rows, previous["prefix_hash"] if reason is None else None, *aggregation
+    )
+    if not matched:
+        reason = "rows before the watermark changed"
+    if reason is None:
+        site_counts = merge_site_counts([previous["counts"], new_counts]).sort_values(ascending=False, kind="stable")
+    else:
+        site_counts = new_counts
+
+    watermark = {"rows": rows, "prefix_hash": rows_hash, "aggregation": aggregation, "counts": site_counts}
+    info = {
+        "source": key,
+        "target": str(target_column),
+        "total_rows": rows,
+        "new_rows": rows - prefix_rows,
+        "full_recount": reason is not None,
+        "reason": reason,
+    }
+    return site_counts, watermark, info
+
+
+def count_jobs(source_files, jobs, keys, aggregations, count_sources, db_path=None):
+    """Site counts for (source, target, mode) jobs where Incremental jobs use their watermark.
+
+    Other jobs are counted by `count_sources(files, aggregations)` (e.g. processing.count_sources or the
+    upload cache) in one call. Returns (site_counts per job, pending watermarks for commit_watermarks).
+    """
+    jobs = list(jobs)
+    aggregations = list(aggregations) if aggregations is not None else [(AGGREGATIONS[0], None)] * len(jobs)
+    regular = [i for i, (_, _, mode) in enumerate(jobs) if mode != INCREMENTAL_MODE]
+    site_counts = [None] * len(jobs)
+    if regular:
+        counted = count_sources([source_files[i] for i in regular], [aggregations[i] for i in regular])
+        for i, counts in zip(regular, counted):
+            site_counts[i] = counts
+    pending = []
+    for i, (_, target_column, mode) in enumerate(jobs):
+        if mode == INCREMENTAL_MODE:
+            site_counts[i], watermark, info = count_incremental(
+                source_files[i], keys[i], target_column, aggregations[i], db_path
+            )
+            pending.append((keys[i], target_column, watermark, info))
+    return site_counts, pending
+
+
+def commit_watermarks(pending, db_path=None) -> list:
+    """Save the watermarks returned by count_jobs; returns their info dicts."""
+    for key, target_column, watermark, _ in pending:
+        save_watermark(key, target_column, watermark, db_path)
+    return [info for _, _, _, info in pending]